@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - Benchmark'''
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+# Headless, has to be set before pygame is initialized
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from lib.AppConfig import AppConfig
+from lib.cache.FontCache import FontCache
+from gui.GUI import GUI
+from gui.entities.Wheel import Wheel
+from lib.SurfarrayRotator import SurfarrayRotator
+
+
+def _parse_args():
+    '''Parses the command line arguments
+
+    :return: The arguments
+    '''
+    parser = argparse.ArgumentParser(description='Benchmarks the wheel headlessly. Run from the project root.')
+    parser.add_argument('--output', default='benchmark.json', help='The JSON file to write the results to')
+    parser.add_argument('--iterations', type=int, default=200, help='Measured iterations per benchmark')
+    parser.add_argument('--warmup', type=int, default=10, help='Unmeasured iterations per benchmark')
+    parser.add_argument('--screen-sizes', type=int, nargs='+', default=[400, 800, 1600], help='Square screen sizes')
+    parser.add_argument('--segments', type=int, nargs='+', default=[8, 100, 1000], help='Numbers of wheel segments')
+    parser.add_argument('--speeds', type=float, nargs='+', default=[0, 1, 5, 20], help='Wheel speeds in degrees per step')
+    parser.add_argument('--rotation-engine', choices=['rotozoom', 'surfarray'], help='The rotation engine, defaults to the configured one')
+    parser.add_argument('--rotation-quality', choices=SurfarrayRotator.QUALITIES, help='The surfarray rotation quality, defaults to the configured one')
+    parser.add_argument('--no-rotation-cache', action='store_true', help='Rotates every frame instead of caching the rotations')
+    return parser.parse_args()
+
+
+def _statistics(samples):
+    '''Returns statistics of the samples
+
+    :param samples: List of durations in seconds
+    :return: Dictionary of statistics in milliseconds
+    '''
+    samples = sorted(s * 1000 for s in samples)
+
+    def percentile(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+    return {
+        'mean': sum(samples) / len(samples),
+        'min': samples[0],
+        'p50': percentile(50),
+        'p90': percentile(90),
+        'p99': percentile(99),
+        'max': samples[-1]
+    }
+
+
+def _measure(func, iterations, warmup, setup=None):
+    '''Measures the durations of a function
+
+    :param func: The function to measure
+    :param iterations: The number of measured iterations
+    :param warmup: The number of unmeasured iterations
+    :param setup: Function called before every iteration, not measured
+    :return: List of durations in seconds
+    '''
+    samples = []
+    for i in range(warmup + iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(duration)
+    return samples
+
+
+def _create_gui(args, screen_size, nr_of_segments):
+    '''Creates and initializes a GUI without task editor, task file, spin history and recording
+
+    :param args: The arguments
+    :param screen_size: The screen size
+    :param nr_of_segments: The number of tasks
+    :return: The GUI
+    '''
+    appconfig = AppConfig()
+    _configure_rotation(appconfig, args)
+    appconfig.tasksFilePath = None
+    appconfig.watch_tasks = False
+    appconfig.show_task_editor = False
+    appconfig.startup_report = False
+    # Synthetic spins stay out of the spin history and the recordings
+    appconfig.spin_history_enabled = False
+    appconfig.record_sessions = False
+    appconfig.screen_size = (screen_size, screen_size)
+
+    gui = GUI(appconfig)
+    gui.tasks.tasks = ['Task #{}'.format(i + 1) for i in range(nr_of_segments)]
+    gui._init()
+    return gui
+
+
+def _configure_rotation(appconfig, args):
+    '''Applies the rotation arguments to the config
+
+    :param appconfig: The AppConfig
+    :param args: The arguments
+    '''
+    if args.rotation_engine:
+        appconfig.rotation_engine = args.rotation_engine
+    if args.rotation_quality:
+        appconfig.rotation_quality = args.rotation_quality
+    if args.no_rotation_cache:
+        appconfig.rotation_cache_enabled = False
+
+
+def _create_wheel(gui):
+    '''Creates a wheel like the GUI does
+
+    :param gui: The GUI
+    :return: The wheel
+    '''
+    wheel = gui.wheel
+    new_wheel = Wheel(gui.appconfig, gui.tasks, gui.imagecache, gui.soundcache, wheel.size, wheel.pos, wheel.pos_shift)
+    new_wheel.move_to(wheel.rect.center)
+    return new_wheel
+
+
+def _run(args):
+    '''Runs all benchmarks
+
+    :param args: The arguments
+    :return: List of results
+    '''
+    results = []
+
+    def add(name, samples, screen_size, nr_of_segments, speed=None):
+        result = {
+            'benchmark': name,
+            'screen_size': screen_size,
+            'segments': nr_of_segments,
+            'speed': speed,
+            'iterations': len(samples),
+            'ms': _statistics(samples)
+        }
+        logging.info('{:<18} size={:<5} segments={:<5} speed={:<5} p50={:8.3f} ms p99={:8.3f} ms'.format(
+            name, screen_size, nr_of_segments, str(speed), result['ms']['p50'], result['ms']['p99']))
+        results.append(result)
+
+    for screen_size in args.screen_sizes:
+        for nr_of_segments in args.segments:
+            gui = _create_gui(args, screen_size, nr_of_segments)
+            screen = gui.screen
+
+            # Face build with cold label cache
+            add('wheel_init', _measure(lambda: _create_wheel(gui), args.iterations, args.warmup,
+                                       setup=FontCache.renders.clear), screen_size, nr_of_segments)
+
+            add('background_draw', _measure(lambda: gui.background.draw(screen), args.iterations, args.warmup),
+                screen_size, nr_of_segments)
+            add('stopper_draw', _measure(lambda: gui.stopper.draw(screen), args.iterations, args.warmup),
+                screen_size, nr_of_segments)
+
+            for speed in args.speeds:
+                wheel = gui.wheel
+
+                def spin():
+                    wheel.physics.angle_increase = speed
+
+                def fixed_update_and_update():
+                    wheel.fixed_update()
+                    wheel.update(0.5)
+
+                def frame():
+                    gui.accumulator = gui.step_time
+                    gui._run_frame()
+
+                add('wheel_update', _measure(fixed_update_and_update, args.iterations, args.warmup, setup=spin),
+                    screen_size, nr_of_segments, speed)
+                add('wheel_draw', _measure(lambda: wheel.draw(screen), args.iterations, args.warmup, setup=spin),
+                    screen_size, nr_of_segments, speed)
+                add('frame', _measure(frame, args.iterations, args.warmup, setup=spin),
+                    screen_size, nr_of_segments, speed)
+
+            gui._quit()
+
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO,
+                        format='[%(asctime)s] [%(levelname)-5s] %(message)s',
+                        datefmt='%d-%m-%Y %H:%M:%S')
+
+    args = _parse_args()
+    appconfig = AppConfig()
+    _configure_rotation(appconfig, args)
+    results = _run(args)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': sys.version.split()[0],
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'sdl_videodriver': os.environ.get('SDL_VIDEODRIVER'),
+            'sdl_audiodriver': os.environ.get('SDL_AUDIODRIVER')
+        },
+        'iterations': args.iterations,
+        'warmup': args.warmup,
+        'rotation': {
+            'engine': appconfig.rotation_engine,
+            'quality': appconfig.rotation_quality,
+            'cache': appconfig.rotation_cache_enabled
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logging.info('Wrote results to "{}"'.format(args.output))
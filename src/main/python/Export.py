@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - Export'''
+
+import argparse
+import logging
+import os
+import time
+
+# Headless, has to be set before pygame is initialized, worker processes inherit it
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from lib.AppConfig import AppConfig
+from lib.SpinExporter import SpinExporter
+from lib.SpinRecorder import SpinRecorder
+from gui.GUI import GUI
+
+
+def _parse_args():
+    '''Parses the command line arguments
+
+    :return: The arguments
+    '''
+    parser = argparse.ArgumentParser(description='Exports a spin as GIF, WebP or PNG sequence without a window. Run from the project root.')
+    parser.add_argument('output', help='The output file, the output directory for PNG sequences')
+    parser.add_argument('--format', choices=SpinExporter.FORMATS, help='The output format, defaults to the output file extension')
+    parser.add_argument('--recording', help='A recorded session to export')
+    parser.add_argument('--seed', type=int, help='The session seed if not exporting a recording, defaults to a random one')
+    parser.add_argument('--speed', type=float, default=15, help='The initial wheel speed in degrees per step if not exporting a recording')
+    parser.add_argument('--fps', type=int, default=30, help='Frames per second, GIF players handle up to 50')
+    parser.add_argument('--size', type=int, help='The square frame size, defaults to the screen size')
+    parser.add_argument('--workers', type=int, help='The number of worker processes, defaults to the number of CPUs')
+    parser.add_argument('--tail', type=float, default=1.0, help='Seconds to keep showing the result')
+    return parser.parse_args()
+
+
+def _get_metadata(args):
+    '''Returns the session metadata of the recording or the current tasks
+
+    :param args: The arguments
+    :return: Tuple of the metadata and the recorded events, number of steps and resizes
+    '''
+    if args.recording:
+        metadata, events, nr_of_steps, _, resizes = SpinRecorder.load(args.recording)
+        return metadata, events, nr_of_steps, resizes
+
+    appconfig = AppConfig()
+    appconfig.seed = args.seed
+    # The whole spin is shown
+    appconfig.spin_mode = 'animate'
+    # Not initialized, only the session is set up
+    metadata = GUI(appconfig).get_session_metadata()
+    return metadata, None, None, None
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO,
+                        format='[%(asctime)s] [%(levelname)-5s] %(message)s',
+                        datefmt='%d-%m-%Y %H:%M:%S')
+
+    args = _parse_args()
+    output_format = args.format or os.path.splitext(args.output)[1].lstrip('.').lower() or 'png'
+
+    metadata, events, nr_of_steps, resizes = _get_metadata(args)
+    logging.info('Exporting session with seed {}'.format(metadata['seed']))
+
+    start = time.perf_counter()
+    exporter = SpinExporter(metadata, fps=args.fps, size=(args.size, args.size) if args.size else None,
+                            workers=args.workers, tail=args.tail)
+    trace = exporter.simulate(events, nr_of_steps, speed=None if args.recording else args.speed, resizes=resizes)
+    frames = exporter.get_frames(trace)
+    exporter.export(frames, args.output, output_format)
+    duration = time.perf_counter() - start
+
+    clip_duration = len(frames) / args.fps
+    logging.info('Exported {:.1f}s of clip in {:.1f}s ({:.2f}x real time)'.format(clip_duration, duration, clip_duration / duration))
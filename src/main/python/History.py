@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - History'''
+
+import argparse
+import logging
+import time
+
+from lib.AppConfig import AppConfig
+from lib.SpinHistory import SpinHistory
+
+
+def _parse_args():
+    '''Parses the command line arguments
+
+    :return: The arguments
+    '''
+    parser = argparse.ArgumentParser(description='Shows how often the wheel stopped on each task.')
+    parser.add_argument('--hours', type=float, default=24, help='Counts the spins of the last hours, 0 for all spins')
+    parser.add_argument('--path', help='The spin history, defaults to the configured one')
+    parser.add_argument('--list', action='store_true', help='Lists the spins instead of counting them')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO,
+                        format='[%(asctime)s] [%(levelname)-5s] %(message)s',
+                        datefmt='%d-%m-%Y %H:%M:%S')
+
+    args = _parse_args()
+    path = args.path or AppConfig().spin_history_path
+    # The app may be writing it
+    history = SpinHistory(path, read_only=True)
+    since = time.time() - args.hours * 3600 if args.hours else None
+
+    if args.list:
+        for timestamp, seed, task, duration in history.get_records(since):
+            print('{}\t{}\t{:.1f}s\t{}'.format(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)), seed, duration, task))
+    else:
+        counts = history.get_counts(since)
+        for task, count in sorted(counts.items(), key=lambda item: -item[1]):
+            print('{}\t{}'.format(count, task if task is not None else '-'))
+        logging.info('{} spins'.format(sum(counts.values())))
+    history.close()
@@ -14,8 +14,12 @@ import sys
 import time
 from pathlib import Path
 
+from lib.StartupTimer import StartupTimer
+startuptimer = StartupTimer()
+
 from lib.AppConfig import AppConfig
 from gui.GUI import GUI
+startuptimer.mark('Imports')
 
 
 # Logging configuration
@@ -48,6 +52,7 @@ if __name__ == '__main__':
 
     appconfig = AppConfig()
 
-    gui = GUI(appconfig)
-    gui.read_tasks()
+    gui = GUI(appconfig, startuptimer)
+    if appconfig.show_task_editor:
+        gui.read_tasks()
     gui.run()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - Replay'''
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Headless, has to be set before pygame is initialized
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from lib.AppConfig import AppConfig
+from lib.SpinRecorder import SpinRecorder
+from gui.GUI import GUI
+
+
+def _parse_args():
+    '''Parses the command line arguments
+
+    :return: The arguments
+    '''
+    parser = argparse.ArgumentParser(description='Replays a recorded session headlessly at maximum speed. Run from the project root.')
+    parser.add_argument('recording', help='The recording file')
+    parser.add_argument('--trace', help='The CSV file to write the angles of the wheels after every step to')
+    return parser.parse_args()
+
+
+def _replay(gui, events, nr_of_steps, resizes, trace=None):
+    '''Replays the recorded input
+
+    :param gui: The GUI
+    :param events: List of (step, mouse state) events
+    :param nr_of_steps: The number of steps to replay
+    :param resizes: List of (step, window size) resizes
+    :param trace: The file to write the angles to, optional
+    :return: The checksum of the angle trace
+    '''
+    checksum = 0
+    mouse_state = (False, 0, 0)
+    event_index = 0
+    resize_index = 0
+    for step in range(nr_of_steps):
+        while resize_index < len(resizes) and resizes[resize_index][0] <= step:
+            gui._resize(resizes[resize_index][1])
+            resize_index += 1
+        while event_index < len(events) and events[event_index][0] <= step:
+            mouse_state = events[event_index][1]
+            event_index += 1
+        # Only the simulation, nothing is drawn
+        gui._fixed_update(mouse_state)
+        angles = gui.get_angles()
+        checksum = SpinRecorder.update_checksum(checksum, angles)
+        if trace:
+            trace.write('{},{}\n'.format(step, ','.join(repr(a) for a in angles)))
+    return checksum
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO,
+                        format='[%(asctime)s] [%(levelname)-5s] %(message)s',
+                        datefmt='%d-%m-%Y %H:%M:%S')
+
+    args = _parse_args()
+    metadata, events, nr_of_steps, recorded_checksum, resizes = SpinRecorder.load(args.recording)
+    if nr_of_steps is None:
+        logging.warning('The recording was not finished, replaying up to the last input')
+        nr_of_steps = events[-1][0] + 1 if events else 0
+
+    appconfig = AppConfig()
+    # Nothing is drawn
+    appconfig.rotation_cache_enabled = False
+    gui = GUI.create_headless(appconfig, metadata)
+    start = time.perf_counter()
+    if args.trace:
+        with open(args.trace, 'w') as trace:
+            trace.write('step,{}\n'.format(','.join('wheel_{}'.format(i + 1) for i in range(len(gui.wheels)))))
+            checksum = _replay(gui, events, nr_of_steps, resizes, trace)
+    else:
+        checksum = _replay(gui, events, nr_of_steps, resizes)
+    duration = time.perf_counter() - start
+    gui._quit()
+
+    logging.info('Replayed {} steps ({:.1f}s of session time) in {:.2f}s, checksum {:08x}'.format(
+        nr_of_steps, nr_of_steps / metadata['physics_rate'], duration, checksum))
+    if recorded_checksum is None:
+        sys.exit(0)
+    if checksum != recorded_checksum:
+        logging.error('The replay differs from the recording, recorded checksum {:08x}'.format(recorded_checksum))
+        sys.exit(1)
+    logging.info('The replay matches the recording')
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - Server'''
+
+import argparse
+import asyncio
+import logging
+
+from lib.AppConfig import AppConfig
+from lib.SpinServer import SpinServer
+from lib.Tasks import Tasks
+
+
+def _parse_args(appconfig):
+    '''Parses the command line arguments
+
+    :param appconfig: The app config with the defaults
+    :return: The arguments
+    '''
+    parser = argparse.ArgumentParser(description='Serves wheel spins over HTTP without a window.')
+    parser.add_argument('--host', default=appconfig.server_host, help='The host to listen on')
+    parser.add_argument('--port', type=int, default=appconfig.server_port, help='The port to listen on')
+    parser.add_argument('--tasks', default=appconfig.tasksFilePath, help='The tasks file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO,
+                        format='[%(asctime)s] [%(levelname)-5s] %(message)s',
+                        datefmt='%d-%m-%Y %H:%M:%S')
+
+    appconfig = AppConfig()
+    args = _parse_args(appconfig)
+    appconfig.server_host = args.host
+    appconfig.server_port = args.port
+    appconfig.tasksFilePath = args.tasks
+
+    if appconfig.tasks_backend == 'mmap':
+        from lib.MappedTasks import MappedTasks
+        tasks = MappedTasks(appconfig)
+    else:
+        tasks = Tasks(appconfig)
+
+    server = SpinServer(appconfig, tasks)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logging.info('Stopped')
@@ -9,20 +9,28 @@
 '''Wheel of Fun - GUI'''
 
 import logging
+import math
+import os
+import random
+import time
 
 import pygame
 
-import tkinter as tk
-from tkinter import *
-
 import gui.Colors as colors
+from lib.cache.FaceCache import FaceCache
+from lib.cache.FontCache import FontCache
 from lib.cache.ImageCache import ImageCache
 from lib.cache.SoundCache import SoundCache
 from gui.entities.Background import Background
+from gui.entities.PerformanceHud import PerformanceHud
 from gui.entities.Stopper import Stopper
 from gui.entities.Wheel import Wheel
 from gui.Text import Text
+from lib.FrameProfiler import FrameProfiler
+from lib.SpinHistory import SpinHistory
+from lib.SpinRecorder import SpinRecorder
 from lib.Tasks import Tasks
+from lib.TasksWatcher import TasksWatcher
 
 
 class GUI():
@@ -33,10 +41,11 @@ class GUI():
     # event.button: MOUSEBUTTONDOWN_LEFT = 1
     # event.button: MOUSEBUTTONDOWN_RIGHT = 3
 
-    def __init__(self, appconfig):
+    def __init__(self, appconfig, startuptimer=None):
         '''Initializes the GUI
 
         :param appconfig: The app config
+        :param startuptimer: The startup timer
         '''
         logging.debug('Initializing GUI')
 
@@ -45,40 +54,53 @@ class GUI():
         self.screen = None
         self.screen_mid = (0, 0)
         self.entities = []
+        self.wheels = []
+        self.stoppers = []
         self.wheel = None
-
-        self.rootTk = tk.Tk()
-        self.entry_texts = []
-
-        self.tasks = Tasks(self.appconfig)
-
-    def _done_reading(self):
-        tasks = [et.get() for et in self.entry_texts]
-        self.tasks.save_tasks(tasks)
-        self.rootTk.destroy()
-        self.rootTk.quit()
+        self.facecache = None
+        self.tasks_watcher = None
+        self.startuptimer = startuptimer
+
+        self.profiler = None
+        self.performance_hud = None
+
+        self.step_time = 1 / self.appconfig.physics_rate
+        self.accumulator = 0
+        self.running = False
+
+        self.seed = self.appconfig.seed
+        if self.seed is None:
+            self.seed = random.getrandbits(32)
+        logging.info('Session seed: {}'.format(self.seed))
+        self.mouse_state = (False, 0, 0)
+        self.nr_of_fixed_steps = 0
+        self.recorder = None
+        self.spinhistory = None
+        # Size and time of the last resize event not laid out yet
+        self.resize_pending = None
+
+
+        if self.appconfig.tasks_backend == 'mmap':
+            # Imported only when needed, NumPy takes a while to import
+            from lib.MappedTasks import MappedTasks
+            self.tasks = MappedTasks(self.appconfig, self.seed)
+        else:
+            self.tasks = Tasks(self.appconfig, self.seed)
+        self._mark_startup('Tasks')
 
     def read_tasks(self):
         '''Reads the tasks'''
         logging.info('Reading tasks')
 
-        self.rootTk.protocol('WM_DELETE_WINDOW', self._done_reading)
-        self.rootTk.title(self.appconfig.i18n.get('APP.NAME'))
-        row = 0
-        for i in range(0, 8):
-            Label(self.rootTk, text='Task #{}:\t'.format(i + 1)).grid(row=row)
-            entry_text = tk.StringVar()
-            e = Entry(self.rootTk, textvariable=entry_text)
-            if len(self.tasks.tasks) > i:
-                entry_text.set(self.tasks.tasks[i])
-            else:
-                entry_text.set('')
-            self.entry_texts.append(entry_text)
-            e.grid(row=row, column=1)
-            row = row + 1
-        Button(self.rootTk, text=self.appconfig.i18n.get('BUTTON.TASKS.OK'), command=self._done_reading).grid(row=row, column=0, sticky=W, pady=4)
-        self.rootTk.mainloop()
+        if self.appconfig.tasks_backend == 'mmap':
+            logging.info('Not editing tasks, the task file is too large for the editor')
+            return
+
+        # Imported only when the task editor is shown, loading Tk takes a while
+        from gui.TaskEditor import TaskEditor
 
+        TaskEditor(self.appconfig, self.tasks).show()
+        self._mark_startup('Task editor')
 
     def run(self):
         '''Game loop'''
@@ -86,38 +108,290 @@ class GUI():
 
         self._init()
 
+        first_frame = True
         clock = pygame.time.Clock()
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
+        self.accumulator = self.step_time
+        self.running = True
+        while self.running:
+            self._run_frame()
+
+            if first_frame:
+                first_frame = False
+                self._mark_startup('First frame')
+                self._report_startup()
+
+            if self.appconfig.idle_enabled and self._is_idle():
+                if self.profiler:
+                    # Closed before sleeping, the time slept is no frame time
+                    self.profiler.end_frame()
+                self._wait_for_input()
+                # The time slept is not simulated, nothing moved
+                clock.tick()
+                self.accumulator = self.step_time
+                if self.profiler:
+                    self.profiler.export_if_due()
+                continue
+
+            start = time.perf_counter()
+            self.accumulator += clock.tick(self.appconfig.fps) / 1000
+            if self.profiler:
+                self.profiler.add('sleep', time.perf_counter() - start)
+                self.profiler.end_frame()
+                self.profiler.export_if_due()
+
+        self._quit()
+
+    def _is_idle(self):
+        '''Returns whether nothing changes on screen until there is input
+
+        :return: True if idle, False else
+        '''
+        return self.running and not self.resize_pending and all(entity.is_idle() for entity in self.entities)
 
-            for entity in self.entities:
-                entity.update()
+    def _get_idle_timeout(self):
+        '''Returns how long to sleep at most while idle, short enough for the tasks watcher and the profiler export
 
-            for entity in self.entities:
-                entity.draw(self.screen)
+        :return: The timeout in seconds
+        '''
+        timeout = self.appconfig.idle_max_wait
+        if self.tasks_watcher:
+            timeout = min(timeout, self.appconfig.tasks_watch_interval)
+        if self.profiler and self.appconfig.profiler_export_interval:
+            timeout = min(timeout, self.appconfig.profiler_export_interval)
+        return timeout
+
+    def _wait_for_input(self):
+        '''Sleeps until there is an event or the idle timeout passed'''
+        event = pygame.event.wait(int(self._get_idle_timeout() * 1000))
+        if event.type != pygame.NOEVENT:
+            # Handled with the other events of the next frame
+            pygame.event.post(event)
+
+    def _run_frame(self):
+        '''Handles the events, advances the simulation by the accumulated time and draws one frame'''
+        frame_start = time.perf_counter()
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and self.performance_hud:
+                self.performance_hud.toggle()
+            elif event.type == pygame.VIDEORESIZE:
+                self.resize_pending = (event.size, time.perf_counter())
+
+        # Laid out once the window size settled, not for every step of a drag
+        if self.resize_pending and time.perf_counter() - self.resize_pending[1] >= self.appconfig.resize_debounce:
+            self._resize(self.resize_pending[0])
+            self.resize_pending = None
+
+        self._update_tasks()
+
+        nr_of_steps = 0
+        accumulator = self.accumulator
+        while accumulator >= self.step_time and nr_of_steps < self.appconfig.physics_max_steps_per_frame:
+            accumulator -= self.step_time
+            nr_of_steps += 1
+        for mouse_state in self._get_mouse_states(nr_of_steps):
+            self._fixed_update(mouse_state)
+            self.accumulator -= self.step_time
+        if self.accumulator >= self.step_time:
+            logging.debug('Dropping {:.3f}s of simulation time'.format(self.accumulator - self.accumulator % self.step_time))
+            self.accumulator = self.accumulator % self.step_time
+
+        alpha = self.accumulator / self.step_time
+        for entity in self.entities:
+            self._profile(entity, 'update', entity.update, alpha)
+
+        if self.appconfig.dirty_rects:
+            self._draw_dirty()
+        else:
+            self._draw()
+
+        if self.profiler:
+            self.profiler.add('frame', time.perf_counter() - frame_start)
+
+    def _get_mouse_states(self, nr_of_steps):
+        '''Polls the mouse once and spreads its movement since the last step across the steps of the frame
+
+        Every step sees the mouse moving, so dragging feels the same at any frame rate.
+
+        :param nr_of_steps: The number of steps of the frame
+        :return: List of (mouse button, mouse x, mouse y), one per step
+        '''
+        mouse_button, _2, _3 = pygame.mouse.get_pressed()
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        _, last_x, last_y = self.mouse_state
+        mouse_states = []
+        for i in range(1, nr_of_steps + 1):
+            fraction = i / nr_of_steps
+            mouse_states.append((bool(mouse_button), int(round(last_x + (mouse_x - last_x) * fraction)),
+                                 int(round(last_y + (mouse_y - last_y) * fraction))))
+        return mouse_states
+
+    def _fixed_update(self, mouse_state=None):
+        '''Advances all entities by one fixed simulation step
+
+        :param mouse_state: Tuple of the mouse button, mouse x and mouse y to use instead of the mouse, for replays
+        '''
+        if mouse_state is None:
+            mouse_button, _2, _3 = pygame.mouse.get_pressed()
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+            mouse_state = (bool(mouse_button), mouse_x, mouse_y)
+        # All wheels see the same input during a step
+        self.mouse_state = mouse_state
+        if self.recorder:
+            self.recorder.record(self.nr_of_fixed_steps, self.mouse_state)
+
+        for entity in self.entities:
+            self._profile(entity, 'fixed_update', entity.fixed_update)
+
+        if self.recorder:
+            self.recorder.add_angles(self.get_angles())
+        self.nr_of_fixed_steps += 1
+
+    def _get_mouse_state(self):
+        '''Returns the mouse state of the current step
+
+        :return: Tuple of the mouse button, mouse x and mouse y
+        '''
+        return self.mouse_state
 
-            pygame.display.update()
+    def get_angles(self):
+        '''Returns the angles of the wheels
+
+        :return: List of angles
+        '''
+        return [wheel.physics.get_angle() for wheel in self.wheels]
 
-            clock.tick(self.appconfig.fps)
+    def get_wheel_seeds(self):
+        '''Returns the seeds of the wheels, derived from the session seed
 
+        :return: List of seeds
+        '''
+        rng = random.Random(self.seed)
+        return [rng.getrandbits(32) for _ in range(self.appconfig.nr_of_wheels)]
+
+    def _profile(self, entity, name, func, *args):
+        '''Calls the function, records its duration if profiling
+
+        :param entity: The entity or None
+        :param name: The name of the phase
+        :param func: The function
+        :param args: The function arguments
+        '''
+        if not self.profiler:
+            return func(*args)
+
+        start = time.perf_counter()
+        result = func(*args)
+        self.profiler.add('{} {}'.format(type(entity).__name__, name) if entity else name, time.perf_counter() - start)
+        return result
+
+    def _quit(self):
+        '''Stops watching the tasks and shuts pygame down'''
+        if self.tasks_watcher:
+            self.tasks_watcher.stop()
+        if self.recorder:
+            self.recorder.close(self.nr_of_fixed_steps)
+        if self.spinhistory:
+            self.spinhistory.close()
+        if self.profiler and self.appconfig.profiler_export_interval:
+            self.profiler.export()
+        if self.facecache:
+            self.facecache.clear()
+        FontCache.clear()
         pygame.quit()
 
+    def _mark_startup(self, name):
+        '''Marks a startup phase as done
+
+        :param name: The name of the phase
+        '''
+        if self.startuptimer:
+            self.startuptimer.mark(name)
+
+    def _report_startup(self):
+        '''Logs the startup timing report'''
+        if self.startuptimer and self.appconfig.startup_report:
+            self.startuptimer.report()
+
+    def _update_tasks(self):
+        '''Updates the wheels if the tasks file changed'''
+        if not self.tasks_watcher:
+            return
+
+        tasks = self.tasks_watcher.poll()
+        if tasks is not None:
+            self.tasks.tasks = tasks
+            for wheel in self.wheels:
+                wheel.update_tasks()
+
+    def _draw(self):
+        '''Draws all entities and updates the whole display'''
+        for entity in self.entities:
+            self._profile(entity, 'draw', entity.draw, self.screen)
+
+        self._profile(None, 'flip', pygame.display.update)
+
+    def _draw_dirty(self):
+        '''Redraws and updates only the display regions the entities report as changed'''
+        dirty_rects = []
+        for entity in self.entities:
+            dirty_rects.extend(entity.get_dirty_rects())
+        if not dirty_rects:
+            return
+
+        dirty_rects = self._merge_rects(dirty_rects)
+        for rect in dirty_rects:
+            self.screen.set_clip(rect)
+            for entity in self.entities:
+                self._profile(entity, 'draw', entity.draw, self.screen)
+        self.screen.set_clip(None)
+
+        self._profile(None, 'flip', pygame.display.update, dirty_rects)
+
+    def _merge_rects(self, rects):
+        '''Merges overlapping rects
+
+        :param rects: The rects
+        :return: List of non-overlapping rects
+        '''
+        screen_rect = self.screen.get_rect()
+        merged = []
+        for rect in rects:
+            rect = rect.clip(screen_rect)
+            if not rect.width or not rect.height:
+                continue
+            i = rect.collidelist(merged)
+            while i != -1:
+                rect.union_ip(merged.pop(i))
+                i = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
     def _init(self):
         '''Initializes internally'''
         logging.debug('Initializing internally')
 
         self._init_pygame()
+        self._mark_startup('pygame')
+        self._init_spin_history()
         self._init_entities()
+        self._mark_startup('Entities')
+        self._init_recorder()
+        self._init_tasks_watcher()
 
     def _init_pygame(self):
         '''Initializes the game'''
         logging.debug('Initializing pygame')
 
-        pygame.init()
-        self.screen = pygame.display.set_mode(self.appconfig.screen_size)
+        # Only the needed subsystems, pygame.init() brings up all of them
+        SoundCache.pre_init(self.appconfig)
+        pygame.display.init()
+        pygame.font.init()
+        pygame.mixer.init()
+        FontCache.max_renders = self.appconfig.text_cache_max_entries
+        self.screen = pygame.display.set_mode(self.appconfig.screen_size, pygame.RESIZABLE if self.appconfig.resizable else 0)
 
         self.imagecache = ImageCache(self.appconfig)
         self.soundcache = SoundCache(self.appconfig)
@@ -132,13 +406,171 @@ class GUI():
         logging.debug('Initializing entities')
 
         self.background = Background(self.appconfig, self.imagecache, pos=self.screen_mid, display_image=self.appconfig.display_bg_image)
-        pos_shift = 50
-        size_wheel_x = self.appconfig.screen_size[0] - pos_shift * 2
-        size_wheel_y = self.appconfig.screen_size[1] - pos_shift * 2
-        wheel_mid = (size_wheel_x / 2, size_wheel_y / 2)
-        self.wheel = Wheel(self.appconfig, self.tasks, self.imagecache, self.soundcache, (size_wheel_x, size_wheel_y), (wheel_mid[0], wheel_mid[1]), pos_shift)
-        self.stopper = Stopper(self.appconfig, self.imagecache, pos=(self.screen_mid[0], 0))
-
-        self.entities.append(self.background)
-        self.entities.append(self.wheel)
-        self.entities.append(self.stopper)
+        self.facecache = FaceCache(self.appconfig.face_cache_max_unused)
+        wheel_seeds = self.get_wheel_seeds()
+        for i, (size, center, input_rect, stopper_pos, stopper_size) in enumerate(self._get_layout()):
+            wheel = Wheel(self.appconfig, self.tasks, self.imagecache, self.soundcache, (size, size), (size / 2, size / 2),
+                          facecache=self.facecache, input_rect=input_rect, seed=wheel_seeds[i], input_source=self._get_mouse_state,
+                          spinhistory=self.spinhistory)
+            wheel.move_to(center)
+            self.wheels.append(wheel)
+            self.stoppers.append(Stopper(self.appconfig, self.imagecache, pos=stopper_pos, size=stopper_size))
+        self.wheel = self.wheels[0]
+        self.stopper = self.stoppers[0]
+
+        if self.appconfig.profiler_enabled:
+            self.profiler = FrameProfiler(self.appconfig)
+            self.performance_hud = PerformanceHud(self.appconfig, self.profiler, pos=(0, 0))
+        self._collect_entities()
+
+    def _collect_entities(self):
+        '''Collects the entities in drawing order'''
+        # Stoppers are drawn on top of the wheels
+        self.entities = [self.background]
+        self.entities.extend(self.wheels)
+        self.entities.extend(self.stoppers)
+        if self.performance_hud:
+            self.entities.append(self.performance_hud)
+
+    def _get_layout(self):
+        '''Lays the wheels out on the screen, all sizes are derived from the screen size
+
+        :return: List of (wheel size, wheel center, input area or None for everywhere, stopper center, stopper size) per wheel
+        '''
+        if self.appconfig.nr_of_wheels == 1:
+            # 700px on the 800px default screen, the stopper reaches 100px into the wheel
+            size = max(1, int(min(self.appconfig.screen_size) * 0.875))
+            scale = size / 2 / Wheel.DEFAULT_RADIUS
+            top = self.screen_mid[1] - size / 2
+            return [(size, self.screen_mid, None, (self.screen_mid[0], top - 50 * scale), (150 * scale, 300 * scale))]
+
+        nr_of_wheels = self.appconfig.nr_of_wheels
+        cols = int(math.ceil(math.sqrt(nr_of_wheels)))
+        rows = int(math.ceil(nr_of_wheels / cols))
+        cell_x = self.appconfig.screen_size[0] / cols
+        cell_y = self.appconfig.screen_size[1] / rows
+        # Leaves room above each wheel for its stopper
+        size = max(1, int(min(cell_x, cell_y) * 0.84))
+        scale = size / 2 / Wheel.DEFAULT_RADIUS
+        logging.info('Laying out {} wheels in {}x{} cells of {}px'.format(nr_of_wheels, cols, rows, size))
+
+        layout = []
+        for i in range(nr_of_wheels):
+            center = (cell_x * (i % cols + 0.5), cell_y * (i // cols + 0.5))
+            input_rect = pygame.Rect(0, 0, size, size)
+            input_rect.center = center
+            # The lower half of the single wheel stopper
+            stopper_size = (75 * scale, 150 * scale)
+            layout.append((size, center, input_rect, (center[0], center[1] - size / 2 - 50 * scale + stopper_size[1] / 2), stopper_size))
+        return layout
+
+    def _resize(self, size):
+        '''Lays the entities out for a new window size, the wheels keep spinning
+
+        :param size: The window size
+        '''
+        logging.info('Resizing to {}x{}'.format(*size))
+        self.appconfig.screen_size = tuple(size)
+        if self.recorder:
+            # Moves the wheels and their input areas, the replay has to do the same
+            self.recorder.record_resize(self.nr_of_fixed_steps, self.appconfig.screen_size)
+        self.screen = pygame.display.set_mode(self.appconfig.screen_size, pygame.RESIZABLE)
+        self.screen_mid = (self.appconfig.screen_size[0] / 2, self.appconfig.screen_size[1] / 2)
+
+        self.background = Background(self.appconfig, self.imagecache, pos=self.screen_mid, display_image=self.appconfig.display_bg_image)
+        self.stoppers = []
+        for wheel, (size, center, input_rect, stopper_pos, stopper_size) in zip(self.wheels, self._get_layout()):
+            wheel.resize((size, size), center)
+            wheel.input_rect = input_rect
+            self.stoppers.append(Stopper(self.appconfig, self.imagecache, pos=stopper_pos, size=stopper_size))
+        self.stopper = self.stoppers[0]
+        self._collect_entities()
+        logging.debug('Face cache: {} hits, {} misses'.format(self.facecache.hits, self.facecache.misses))
+
+    def _init_spin_history(self):
+        '''Opens the spin history'''
+        if not self.appconfig.spin_history_enabled:
+            return
+
+        try:
+            self.spinhistory = SpinHistory(self.appconfig.spin_history_path, self.appconfig.spin_history_flush_interval)
+            self.spinhistory.start()
+        except Exception as e:
+            logging.error('Error opening spin history "{}": {}'.format(self.appconfig.spin_history_path, e))
+
+    def _init_recorder(self):
+        '''Starts recording the session'''
+        if not self.appconfig.record_sessions:
+            return
+
+        metadata = self.get_session_metadata()
+        path = os.path.join(self.appconfig.recordings_dir, 'session-{}-{}.wfr'.format(time.strftime('%Y%m%d-%H%M%S'), self.seed))
+        try:
+            self.recorder = SpinRecorder(path, metadata)
+        except Exception as e:
+            logging.error('Error recording session to "{}": {}'.format(path, e))
+
+    def get_session_metadata(self):
+        '''Returns what it takes to set up the same session again
+
+        :return: Dictionary of JSON serializable metadata
+        '''
+        return {
+            'version': 1,
+            'seed': self.seed,
+            'screen_size': list(self.appconfig.screen_size),
+            'nr_of_wheels': self.appconfig.nr_of_wheels,
+            'min_segments': self.appconfig.min_segments,
+            'physics_rate': self.appconfig.physics_rate,
+            'spin_mode': self.appconfig.spin_mode,
+            'spin_fast_forward_factor': self.appconfig.spin_fast_forward_factor,
+            'draw_mode': self.appconfig.draw_mode,
+            'tasks': list(self.tasks.tasks),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+
+    @staticmethod
+    def create_headless(appconfig, metadata):
+        '''Creates and initializes a GUI for the session without task editor, task file, recording and profiling
+
+        :param appconfig: The app config
+        :param metadata: The session metadata
+        :return: The GUI
+        '''
+        appconfig.tasksFilePath = None
+        appconfig.watch_tasks = False
+        appconfig.show_task_editor = False
+        appconfig.startup_report = False
+        appconfig.profiler_enabled = False
+        appconfig.record_sessions = False
+        appconfig.spin_history_enabled = False
+
+        appconfig.seed = metadata['seed']
+        appconfig.screen_size = tuple(metadata['screen_size'])
+        appconfig.nr_of_wheels = metadata['nr_of_wheels']
+        appconfig.min_segments = metadata['min_segments']
+        appconfig.physics_rate = metadata['physics_rate']
+        appconfig.spin_mode = metadata['spin_mode']
+        appconfig.spin_fast_forward_factor = metadata['spin_fast_forward_factor']
+        # Recorded before the draw modes were added
+        appconfig.draw_mode = metadata.get('draw_mode', 'physics')
+
+        gui = GUI(appconfig)
+        gui.tasks.tasks = list(metadata['tasks'])
+        gui._init()
+        return gui
+
+    def _init_tasks_watcher(self):
+        '''Initializes the tasks watcher'''
+        if not self.appconfig.watch_tasks:
+            return
+        if self.appconfig.tasks_backend == 'mmap':
+            logging.info('Not watching tasks, the task file is memory-mapped')
+            return
+        if self.recorder:
+            # The recording holds the tasks of the session start only, a reload would break the replay
+            logging.info('Not watching tasks, the session is recorded')
+            return
+
+        self.tasks_watcher = TasksWatcher(self.appconfig, self.tasks)
+        self.tasks_watcher.start()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - TaskEditor'''
+
+import logging
+import tkinter as tk
+
+
+class TaskEditor:
+    '''The task editor
+
+    Only the visible rows are widgets, scrolling binds them to other tasks, so the number of tasks does not matter.
+    '''
+
+    SEARCH_DELAY_MS = 200
+
+    def __init__(self, appconfig, tasks):
+        '''Initializes
+
+        :param appconfig: The app config
+        :param tasks: The tasks
+        '''
+        logging.debug('Initializing TaskEditor')
+
+        self.appconfig = appconfig
+        self.tasks = tasks
+
+        self.nr_of_rows = self.appconfig.task_editor_rows
+
+        # All tasks in file order, edited in place
+        self.items = []
+        self.nr_of_saved = 0
+        # Indices of the tasks deleted before, they keep their place until the journal is applied to the file
+        self.deleted = set()
+        # Task index -> changed task
+        self.changes = {}
+        # Indices of the tasks matching the search
+        self.view = []
+        self.first = 0
+
+        self.rootTk = None
+        self.search_text = None
+        self.search_job = None
+        self.count_text = None
+        self.scrollbar = None
+        self.rows = []
+
+    def show(self):
+        '''Shows the editor, blocks until it is closed'''
+        # Earlier changes are applied in memory, the changes are appended to the journal on saving
+        try:
+            self.items = self.tasks.read_entries() if self.appconfig.tasksFilePath else []
+        except Exception as e:
+            logging.error('Error loading file "{}: {}"'.format(self.appconfig.tasksFilePath, e))
+            self.items = []
+        self.nr_of_saved = len(self.items)
+        self.deleted = {i for i, task in enumerate(self.items) if not task or task.startswith('#')}
+        self.view = self._get_matches('')
+        logging.info('Editing {} tasks'.format(len(self.view)))
+
+        self._init_widgets()
+        self._show_rows()
+        self.rootTk.mainloop()
+
+    def _init_widgets(self):
+        '''Initializes the window and the row widgets'''
+        self.rootTk = tk.Tk()
+        self.rootTk.protocol('WM_DELETE_WINDOW', self._done)
+        self.rootTk.title(self.appconfig.i18n.get('APP.NAME'))
+
+        top = tk.Frame(self.rootTk)
+        top.pack(fill=tk.X, padx=4, pady=4)
+        tk.Label(top, text=self.appconfig.i18n.get('LABEL.TASKS.SEARCH')).pack(side=tk.LEFT)
+        self.search_text = tk.StringVar()
+        self.search_text.trace_add('write', self._on_search_changed)
+        tk.Entry(top, textvariable=self.search_text).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.count_text = tk.StringVar()
+        tk.Label(top, textvariable=self.count_text).pack(side=tk.LEFT, padx=4)
+
+        middle = tk.Frame(self.rootTk)
+        middle.pack(fill=tk.BOTH, expand=True, padx=4)
+        self.scrollbar = tk.Scrollbar(middle, orient=tk.VERTICAL, command=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        rows = tk.Frame(middle)
+        rows.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        for row in range(self.nr_of_rows):
+            label_text = tk.StringVar()
+            tk.Label(rows, textvariable=label_text, width=10, anchor=tk.W).grid(row=row, column=0)
+            entry_text = tk.StringVar()
+            entry = tk.Entry(rows, textvariable=entry_text, width=50)
+            entry.grid(row=row, column=1, sticky=tk.EW)
+            entry.bind('<KeyRelease>', lambda event, row=row: self._on_row_edited(row))
+            entry.bind('<FocusOut>', lambda event, row=row: self._on_row_edited(row))
+            # Keyboard navigation scrolls at the first and last row
+            entry.bind('<Up>', lambda event, row=row: self._on_row_key(row, -1))
+            entry.bind('<Down>', lambda event, row=row: self._on_row_key(row, 1))
+            self.rows.append([label_text, entry_text, entry, None])
+        rows.columnconfigure(1, weight=1)
+        self.rootTk.bind_all('<MouseWheel>', self._on_mouse_wheel)
+        # X11 reports the mouse wheel as buttons
+        self.rootTk.bind_all('<Button-4>', lambda event: self._scroll_to(self.first - 3))
+        self.rootTk.bind_all('<Button-5>', lambda event: self._scroll_to(self.first + 3))
+
+        bottom = tk.Frame(self.rootTk)
+        bottom.pack(fill=tk.X, padx=4, pady=4)
+        tk.Button(bottom, text=self.appconfig.i18n.get('BUTTON.TASKS.ADD'), command=self._add).pack(side=tk.LEFT)
+        tk.Button(bottom, text=self.appconfig.i18n.get('BUTTON.TASKS.OK'), command=self._done).pack(side=tk.RIGHT)
+
+    def _show_rows(self):
+        '''Binds the row widgets to the tasks from the first visible one on'''
+        for row, widgets in enumerate(self.rows):
+            label_text, entry_text, entry, _ = widgets
+            position = self.first + row
+            if position < len(self.view):
+                index = self.view[position]
+                widgets[3] = index
+                label_text.set('Task #{}:'.format(index + 1))
+                entry_text.set(self.items[index])
+                entry.configure(state=tk.NORMAL)
+            else:
+                widgets[3] = None
+                label_text.set('')
+                entry_text.set('')
+                entry.configure(state=tk.DISABLED)
+
+        if self.view:
+            self.scrollbar.set(self.first / len(self.view), min(1, (self.first + self.nr_of_rows) / len(self.view)))
+        else:
+            self.scrollbar.set(0, 1)
+        self.count_text.set('{} / {}'.format(len(self.view), len(self.items) - len(self.deleted)))
+
+    def _scroll_to(self, first):
+        '''Scrolls the visible rows
+
+        :param first: The position of the first visible task
+        '''
+        first = max(0, min(int(first), len(self.view) - self.nr_of_rows))
+        if first == self.first:
+            return
+        self.first = first
+        self._show_rows()
+
+    def _on_scroll(self, *args):
+        '''Handles the scrollbar
+
+        :param args: ('moveto', fraction) or ('scroll', number, 'units' or 'pages')
+        '''
+        if args[0] == 'moveto':
+            self._scroll_to(float(args[1]) * len(self.view))
+        elif args[0] == 'scroll':
+            step = self.nr_of_rows if args[2] == 'pages' else 1
+            self._scroll_to(self.first + int(args[1]) * step)
+
+    def _on_mouse_wheel(self, event):
+        '''Scrolls on mouse wheel
+
+        :param event: The event
+        '''
+        self._scroll_to(self.first - (3 if event.delta > 0 else -3))
+
+    def _on_row_key(self, row, direction):
+        '''Moves the focus up or down, scrolls at the first and last row
+
+        :param row: The row
+        :param direction: -1 for up, 1 for down
+        '''
+        target = row + direction
+        if 0 <= target < self.nr_of_rows:
+            self.rows[target][2].focus_set()
+        else:
+            self._on_row_edited(row)
+            self._scroll_to(self.first + direction)
+
+    def _on_row_edited(self, row):
+        '''Takes over the text of an edited row
+
+        :param row: The row
+        '''
+        _, entry_text, _, index = self.rows[row]
+        if index is None:
+            return
+        task = entry_text.get()
+        if task != self.items[index]:
+            self.items[index] = task
+            self.changes[index] = task
+
+    def _on_search_changed(self, *args):
+        '''Filters the tasks shortly after the search stops changing
+
+        :param args: The trace arguments
+        '''
+        if self.search_job:
+            self.rootTk.after_cancel(self.search_job)
+        self.search_job = self.rootTk.after(self.SEARCH_DELAY_MS, self._filter)
+
+    def _filter(self):
+        '''Shows only the tasks containing the search text'''
+        self.search_job = None
+        self.view = self._get_matches(self.search_text.get().strip().lower())
+        self.first = 0
+        self._show_rows()
+
+    def _get_matches(self, search):
+        '''Returns the indices of the tasks containing the search text
+
+        :param search: The lowercase search text, empty matches all tasks
+        :return: List of task indices
+        '''
+        if search:
+            return [i for i, task in enumerate(self.items) if i not in self.deleted and search in task.lower()]
+        return [i for i in range(len(self.items)) if i not in self.deleted]
+
+    def _add(self):
+        '''Adds an empty task at the end and focuses it'''
+        self.items.append('')
+        self.changes[len(self.items) - 1] = ''
+        self.search_text.set('')
+        # Filtered right away, the delayed filter would scroll back up
+        self.rootTk.after_cancel(self.search_job)
+        self._filter()
+        self._scroll_to(len(self.view))
+        self.rows[min(len(self.view) - self.first, self.nr_of_rows) - 1][2].focus_set()
+
+    def _done(self):
+        '''Saves the changed tasks and closes the editor'''
+        for row in range(self.nr_of_rows):
+            self._on_row_edited(row)
+        # Added tasks that stayed empty are no change
+        changes = {i: t for i, t in self.changes.items() if t or i < self.nr_of_saved}
+        self.tasks.save_changes(changes)
+        self.rootTk.destroy()
+        self.rootTk.quit()
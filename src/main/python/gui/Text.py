@@ -12,6 +12,8 @@ import logging
 
 import pygame
 
+from lib.cache.FontCache import FontCache
+
 
 class Text():
 
@@ -38,21 +40,7 @@ class Text():
         self.color = color
         self.rotation_angle = rotation_angle
 
-        self.font = pygame.font.SysFont(self.appconfig.fontname, self.fontsize)
-
-    def _rotate(self, surface, angle, pivot, offset):
-        """Rotate the surface around a pivot point
-
-        Args:
-            surface (pygame.Surface): The surface that is to be rotated
-            angle (float): Rotation angle
-            pivot (tuple, list, pygame.math.Vector2): The pivot point
-            offset (pygame.math.Vector2): Offset vector that is added to the pivot point
-        """
-        rotated_image = pygame.transform.rotozoom(surface, angle, 1)
-        rotated_offset = offset.rotate(angle)
-        rect = rotated_image.get_rect(center=pivot+rotated_offset)
-        return rotated_image, rect
+        self.font = FontCache.get_font(self.appconfig.fontname, self.fontsize)
 
     def _draw_text(self, surface, font, x, y, text, color):
         '''Draws text
@@ -64,15 +52,19 @@ class Text():
         :param text: The text
         :param color: The text color
         '''
-        text_rect = surface.get_rect()
-        ftext = font.render(text, True, color)
-
-        pivot = pygame.math.Vector2(self.pos[0], self.pos[1])
-        offset = pygame.math.Vector2(0, 0)
-        rotated_image, rect = self._rotate(ftext, self.rotation_angle, pivot, offset)
+        rotated_image = FontCache.render(text, self.appconfig.fontname, self.fontsize, color, self.rotation_angle)
+        rect = rotated_image.get_rect(center=(x, y))
 
         surface.blit(rotated_image, rect)
 
+    def get_rect(self):
+        '''Returns the area the text is drawn on
+
+        :return: The area
+        '''
+        rotated_image = FontCache.render(self.text, self.appconfig.fontname, self.fontsize, self.color, self.rotation_angle)
+        return rotated_image.get_rect(center=(self.pos[0], self.pos[1]))
+
     def update(self):
         '''Updates the entity'''
         pass
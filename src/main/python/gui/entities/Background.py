@@ -11,7 +11,6 @@
 import logging
 
 import pygame
-from PIL import Image, ImageDraw
 
 from gui.entities.Entity import Entity
 
@@ -36,11 +35,19 @@ class Background(Entity):
 
         self.size = self.appconfig.screen_size
 
-        self.bgimg = self.imagecache.background
-        self.image = pygame.transform.scale(self.bgimg, self.appconfig.screen_size)
+        self.image = self.imagecache.get_image(self.appconfig.path_img_background, self.appconfig.screen_size)
         self.rect = self.image.get_rect()
         self.rect.center = pos
 
+        self.dirty = True
+
+    # @Override
+    def get_dirty_rects(self):
+        if not self.dirty:
+            return []
+        self.dirty = False
+        return [pygame.Rect((0, 0), self.size)]
+
     # @Override
     def draw(self, surface):
         if self.display_image:
@@ -19,10 +19,31 @@ class Entity(pygame.sprite.Sprite):
         '''Initializes the entity'''
         super(Entity, self)
 
-    def update(self):
-        '''Updates the entity'''
+    def fixed_update(self):
+        '''Advances the entity by one fixed simulation step'''
         pass
 
+    def update(self, alpha=1.0):
+        '''Updates the entity
+
+        :param alpha: Progress between the last two simulation steps, for interpolation
+        '''
+        pass
+
+    def is_idle(self):
+        '''Returns whether the entity stays the same until there is input
+
+        :return: True if idle, False else
+        '''
+        return True
+
+    def get_dirty_rects(self):
+        '''Returns the screen regions changed since the last call
+
+        :return: List of changed regions
+        '''
+        return []
+
     def draw(self, surface):
         '''Draws the entity
 
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - PerformanceHud'''
+
+import logging
+import time
+
+import pygame
+
+import gui.Colors as colors
+from gui.entities.Entity import Entity
+from lib.cache.FontCache import FontCache
+
+
+class PerformanceHud(Entity):
+
+    REFRESH_INTERVAL = 0.5
+    MARGIN = 5
+
+    def __init__(self, appconfig, profiler, pos):
+        '''Initializes
+
+        :param appconfig: The app config
+        :param profiler: The frame profiler
+        :param pos: Top left position of the entity
+        '''
+        super(PerformanceHud, self)
+
+        logging.debug('Initializing PerformanceHud')
+
+        self.appconfig = appconfig
+        self.profiler = profiler
+        self.pos = pos
+
+        self.visible = self.appconfig.profiler_hud_visible
+        self.image = None
+        self.rect = pygame.Rect(pos, (0, 0))
+        self.dirty_rects = []
+        self.last_refresh = 0
+
+    def toggle(self):
+        '''Shows or hides the HUD'''
+        self.visible = not self.visible
+        self.last_refresh = 0
+        if not self.visible:
+            self.dirty_rects.append(self.rect.copy())
+            self.image = None
+
+    def _render(self):
+        '''Renders the statistics into the HUD image'''
+        lines = ['{:<28} {:>7} {:>7} {:>7}'.format('ms', 'p50', 'p99', 'max')]
+        for name, s in sorted(self.profiler.get_statistics().items()):
+            lines.append('{:<28} {:7.2f} {:7.2f} {:7.2f}'.format(name, s['p50'], s['p99'], s['max']))
+
+        # The numbers change with every refresh, caching the lines would only evict the task labels
+        font = FontCache.get_font(self.appconfig.profiler_hud_fontname, self.appconfig.profiler_hud_fontsize)
+        texts = [font.render(line, True, colors.COLOR_WHITE) for line in lines]
+        width = max(t.get_width() for t in texts) + 2 * self.MARGIN
+        height = sum(t.get_height() for t in texts) + 2 * self.MARGIN
+
+        image = pygame.Surface((width, height), pygame.SRCALPHA)
+        image.fill((0, 0, 0, 180))
+        y = self.MARGIN
+        for text in texts:
+            image.blit(text, (self.MARGIN, y))
+            y += text.get_height()
+
+        self.dirty_rects.append(self.rect.copy())
+        self.image = image
+        self.rect = image.get_rect(topleft=self.pos)
+        self.dirty_rects.append(self.rect.copy())
+
+    # @Override
+    def update(self, alpha=1.0):
+        if not self.visible:
+            return
+        now = time.perf_counter()
+        if now - self.last_refresh >= self.REFRESH_INTERVAL:
+            self.last_refresh = now
+            self._render()
+
+    # @Override
+    def is_idle(self):
+        return not self.visible
+
+    # @Override
+    def get_dirty_rects(self):
+        dirty_rects = self.dirty_rects
+        self.dirty_rects = []
+        return dirty_rects
+
+    # @Override
+    def draw(self, surface):
+        if self.image:
+            surface.blit(self.image, self.rect)
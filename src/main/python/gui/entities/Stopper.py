@@ -12,19 +12,19 @@ import logging
 
 import pygame
 import gui.Colors as colors
-from PIL import Image, ImageDraw
 
 from gui.entities.Entity import Entity
 
 
 class Stopper(Entity):
 
-    def __init__(self, appconfig, imagecache, pos):
+    def __init__(self, appconfig, imagecache, pos, size=(150, 300)):
         '''Initializes
 
         :param appconfig: The app config
         :param imagecache: The image cache
         :param pos: Position of the entity
+        :param size: Size of the entity
         '''
         super(Stopper, self)
 
@@ -33,7 +33,7 @@ class Stopper(Entity):
         self.appconfig = appconfig
         self.imagecache = imagecache
         self.pos = pos
-        self.size = (150, 300)
+        self.size = (int(size[0]), int(size[1]))
 
         self.surface = pygame.Surface(self.size)
         self.surface.fill(colors.COLOR_WHITE)
@@ -45,13 +45,16 @@ class Stopper(Entity):
 
         self._draw_graphics(self.image)
 
+        self.dirty = True
+
     def _draw_graphics(self, surface):
         '''Draws the graphical elements
 
         :param surface: The surface to draw on
         '''
         pygame.draw.polygon(surface, colors.COLOR_SGI_GRAY_92, [[0, 0], [self.size[0], 0], [self.size[0] / 2, self.size[1]]], 0)
-        gap = 3
+        # 3px at the default width
+        gap = 3 * self.size[0] / 150
         factor = 1
         pygame.draw.polygon(surface, colors.COLOR_SGI_GRAY_76, [[gap * factor, 0], [self.size[0] - gap * factor, 0], [self.size[0] / 2, self.size[1] - gap * factor]], 0)
         factor += 1
@@ -63,6 +66,13 @@ class Stopper(Entity):
         factor += 1
         pygame.draw.polygon(surface, colors.COLOR_BLACK, [[gap * factor, 0], [self.size[0] - gap * factor, 0], [self.size[0] / 2, self.size[1] - gap * factor]], 0)
 
+    # @Override
+    def get_dirty_rects(self):
+        if not self.dirty:
+            return []
+        self.dirty = False
+        return [self.rect.copy()]
+
     # @Override
     def draw(self, surface):
         '''Draws the wheel
@@ -8,33 +8,35 @@
 
 '''Wheel of Fun - Wheel'''
 
+import colorsys
 import logging
 import math
-import random
 
 import pygame
 from pygame import gfxdraw
-from PIL import Image, ImageDraw
 
 from gui.entities.Entity import Entity
+from lib.cache.FontCache import FontCache
+from lib.cache.RotationCache import RotationCache
 import gui.Colors as colors
 from gui.Text import Text
-from gui.enums.SpinningDirection import SpinningDirection
+from lib.AliasTable import AliasTable
+from lib.SurfarrayRotator import SurfarrayRotator
+from lib.Tasks import Tasks
+from lib.physics.WheelPhysics import WheelPhysics
 
 
 class Wheel(Entity):
 
-    INCREASE_ON_DRAG = 0.1
-    DECREASE_ON_DRAG_STOP = 0.02
-    DECREASE_ON_STOPPER_MIN = 0.01
-    DECREASE_ON_STOPPER_MAX = 0.04
-    THRESHOLD_NOT_SPINNING = 0.01
-    MAX_ANGLE_INCREASE = 20
+    MAX_PARTIAL_REDRAWS = 16
+    # The wheel radius the geometry is designed for, other sizes scale it
+    DEFAULT_RADIUS = 350
 
     WHEEL_COLORS = [colors.COLOR_SKYBLUE_2, colors.COLOR_SPRINGGREEN_1, colors.COLOR_LAVENDERBLUSH_4, colors.COLOR_GOLD_1, colors.COLOR_TAN_1,
                     colors.COLOR_CRIMSON, colors.COLOR_MEDIUMORCHID_2, colors.COLOR_SLATEBLUE_1]
 
-    def __init__(self, appconfig, tasks, imagecache, soundcache, size, pos, pos_shift=0):
+    def __init__(self, appconfig, tasks, imagecache, soundcache, size, pos, pos_shift=0, facecache=None, input_rect=None, seed=None, input_source=None,
+                 spinhistory=None):
         '''Initializes
 
         :param appconfig: The app config
@@ -44,6 +46,11 @@ class Wheel(Entity):
         :param size: Size of the entity
         :param pos: Position of the entity
         :param pos_shift: The position shift of the entity
+        :param facecache: The face cache to share faces with other wheels, optional
+        :param input_rect: The screen area a mouse press has to start in to spin the wheel, defaults to everywhere
+        :param seed: The seed for the random stopper braking
+        :param input_source: Function returning the mouse button, mouse x and mouse y, defaults to polling the mouse
+        :param spinhistory: The spin history to add the results to, optional
         '''
         super(Wheel, self)
 
@@ -56,334 +63,416 @@ class Wheel(Entity):
         self.pos = pos
         self.size = size
         self.pos_shift = pos_shift
+        self.facecache = facecache
+        self.input_rect = input_rect
+        self.input_source = input_source or self._poll_mouse
+        self.spinhistory = spinhistory
+
+        self.nr_of_segments = max(len(self.tasks.tasks), self.appconfig.min_segments)
+        self.radius = 0
+        self.scale = 1
+        self.center = (0, 0)
+        self._set_size(size)
+
+        self.font = FontCache.get_font(self.appconfig.fontname, self.appconfig.fontsize_tasks)
+
+        self.angle_rotated = None
+        self.angle_drawn = None
+
+        self.surface = None
+        self.rotationcache = None
+        self.rotator = None
+        # The surface this wheel's rotator output goes to, the rotator is shared with the wheels showing the same face
+        self.rotated_image = None
+        self.img_wheel_logo = None
+        self.tasks_drawn = []
+        self.label_rects = []
+        self.segment_bounds = []
+        self.alias_table = None
+        self.face_key = None
+        self._init_face()
 
+        self.image = self.surface
+        self.rect = self.image.get_rect()
+        self.rect.center = (pos[0] + self.pos_shift, pos[1] + self.pos_shift)
+
+        # The mouse is in screen coordinates
+        self.physics = WheelPhysics(self.rect.center, seed)
+        self.angle_previous = self.physics.get_angle()
+        self.mouse_pressed_last = False
+        self.mouse_button_last = False
+        self.grabbed = False
+        # Steps since the wheel was released
+        self.nr_of_spin_steps = 0
+        # Identifies the spin in the spin history and reproduces its braking
+        self.spin_seed = None
+
+    def move_to(self, center):
+        '''Moves the wheel on the screen
+
+        :param center: The new center in screen coordinates
+        '''
+        self.rect.center = center
+        self.physics.center = self.rect.center
+        self.angle_drawn = None
+
+    def _set_size(self, size):
+        '''Sets the size the geometry of the face is derived from
+
+        :param size: The size
+        '''
+        self.size = size
         self.radius = self.size[0] / 2
+        self.scale = self.radius / self.DEFAULT_RADIUS
         self.center = (self.size[0] / 2, self.size[1] / 2)
 
-        self.font = pygame.font.SysFont(self.appconfig.fontname, self.appconfig.fontsize_tasks)
-        self.angle = 0
-        self.angle_increase = 0
-        self.spinning_direction_last = []
-        self.spinning_direction = SpinningDirection.NONE
+    def resize(self, size, center):
+        '''Resizes the wheel, keeps it spinning
+
+        The face of the size comes from the face cache if it was shown before.
 
-        self.last_mouse_x = self.pos[0]
-        self.last_mouse_y = self.pos[0]
+        :param size: The new size
+        :param center: The new center in screen coordinates
+        '''
+        if tuple(size) != tuple(self.size):
+            logging.debug('Resizing wheel to {}x{}'.format(*size))
+            if self.facecache:
+                self._release_face()
+            self._set_size(size)
+            self.pos = self.center
+            self.img_wheel_logo = None
+            self._init_face()
+            self.image = self.surface
+        self.move_to(center)
+
+    def _get_face_key(self, tasks):
+        '''Returns the key of the face showing the tasks
+
+        :param tasks: List of tasks
+        :return: The face key
+        '''
+        return (tuple(tasks), max(len(tasks), self.appconfig.min_segments), tuple(self.size))
+
+    def _build_face(self):
+        '''Creates and draws a new wheel face
+
+        :return: Tuple of the surface, its rotation cache, its rotator, the drawn tasks and the label areas
+        '''
+        logging.debug('Drawing wheel face')
 
         self.surface = pygame.Surface(self.size, pygame.SRCALPHA)
         self.surface.set_colorkey(colors.COLOR_BLACK)
 
-        self.image = self.surface
-        self.rect = self.image.get_rect()
-        self.rect.center = (pos[0] + self.pos_shift, pos[1] + self.pos_shift)
+        self.rotator = None
+        if self.appconfig.rotation_engine == 'surfarray':
+            self.rotator = SurfarrayRotator(self.surface, self.appconfig.rotation_quality)
+
+        self.rotationcache = None
+        if self.appconfig.rotation_cache_enabled:
+            # The wheels share the memory budget
+            max_bytes = self.appconfig.rotation_cache_max_bytes // self.appconfig.nr_of_wheels
+            self.rotationcache = RotationCache(self.appconfig.rotation_cache_resolution, max_bytes, self.rotator)
+            self.rotationcache.set_surface(self.surface)
+
+        self._draw_graphics(self.surface)
+        self._draw_tasks(self.surface)
 
-        self._draw_graphics(self.image)
-        self._draw_tasks(self.image)
+        return self._get_face()
+
+    def _get_face(self):
+        '''Returns the current face
+
+        :return: Tuple of the surface, its rotation cache, its rotator, the drawn tasks and the label areas
+        '''
+        return self.surface, self.rotationcache, self.rotator, self.tasks_drawn, self.label_rects
+
+    def _set_face(self, face):
+        '''Shows the given face
+
+        :param face: Tuple of the surface, its rotation cache, its rotator, the drawn tasks and the label areas
+        '''
+        self.surface, self.rotationcache, self.rotator, self.tasks_drawn, self.label_rects = face
+        self.angle_rotated = None
+        self.angle_drawn = None
+        self._update_segments(self.tasks_drawn)
+
+    def _update_segments(self, tasks):
+        '''Sizes the segments by the weights of the tasks, prepares the fair draw
+
+        :param tasks: List of tasks
+        '''
+        weights = Tasks.get_weights(tasks, self.nr_of_segments)
+        self.segment_bounds = WheelPhysics.get_segment_bounds(weights)
+        self.alias_table = None
+        if self.appconfig.draw_mode == 'fair' and sum(weights[:len(tasks)]) > 0:
+            # Only the tasks are drawn, not the empty segments
+            self.alias_table = AliasTable(weights[:len(tasks)])
+
+    def _init_face(self):
+        '''Gets the face from the face cache or draws it'''
+        if not self.facecache:
+            self._set_face(self._build_face())
+            return
+
+        self.face_key = self._get_face_key(self.tasks.tasks)
+        self._set_face(self.facecache.acquire(self.face_key, self._build_face))
+
+    def _release_face(self):
+        '''Gives the face back to the face cache'''
+        if self.facecache.get_users(self.face_key) == 1:
+            # Only the face itself is kept for reuse
+            if self.rotationcache:
+                self.rotationcache.invalidate()
+            if self.rotator:
+                self.rotator.invalidate()
+        self.facecache.release(self.face_key)
 
     def _draw_graphics(self, surface):
         '''Draws the graphical elements
 
         :param surface: The surface to draw on
         '''
+        self._invalidate_rotations()
+        self._update_segments(self.tasks.tasks)
+
         # Outer
         pygame.gfxdraw.filled_circle(surface, int(self.pos[0]), int(self.pos[1]), int(self.size[0] / 2), colors.COLOR_SGI_GRAY_92)
 
         # Pie slices
-        pil_image = Image.new('RGBA', (self.size[0], self.size[1]))
-        start = 0
-        step = 45
-        end = 45
-        band_size = 14
-        for sli in range(8):
-            pil_draw = ImageDraw.Draw(pil_image)
-            pil_draw.pieslice((band_size, band_size, self.size[0] - band_size, self.size[1] - band_size), start, end, fill=self.WHEEL_COLORS[sli])
-            mode = pil_image.mode
-            size = pil_image.size
-            data = pil_image.tobytes()
-            image = pygame.image.fromstring(data, size, mode)
-            surface.blit(image, (0, 0))
-            start = end
-            end += step
-
-        inner_circle_radius = 80
+        band_size = 14 * self.scale
+        self._draw_pie_slices(surface, (self.size[0] - 2 * band_size, self.size[1] - 2 * band_size), (band_size, band_size))
+
+        inner_circle_radius = 80 * self.scale
 
         # Inner circle
-        gap = 5
-        gap_increase = 5
-        pygame.gfxdraw.filled_circle(surface, int(self.pos[0]), int(self.pos[1]), inner_circle_radius - gap, colors.COLOR_SGI_GRAY_92)
+        gap = 5 * self.scale
+        gap_increase = 5 * self.scale
+        pygame.gfxdraw.filled_circle(surface, int(self.pos[0]), int(self.pos[1]), int(inner_circle_radius - gap), colors.COLOR_SGI_GRAY_92)
         gap += gap_increase
-        pygame.gfxdraw.filled_circle(surface, int(self.pos[0]), int(self.pos[1]), inner_circle_radius - gap, colors.COLOR_WHITE)
+        pygame.gfxdraw.filled_circle(surface, int(self.pos[0]), int(self.pos[1]), int(inner_circle_radius - gap), colors.COLOR_WHITE)
 
         # Smaller pie slices
-        small_size = (132, 132)
-        pil_image = Image.new('RGBA', (small_size[0], small_size[1]))
-        start = 0
-        step = 45
-        end = 45
-        band_size = 0
-        for sli in range(8):
-            pil_draw = ImageDraw.Draw(pil_image)
-            pil_draw.pieslice((band_size, band_size, small_size[0] - band_size, small_size[1] - band_size), start, end, fill=self.WHEEL_COLORS[sli])
-            mode = pil_image.mode
-            size = pil_image.size
-            data = pil_image.tobytes()
-            image = pygame.image.fromstring(data, small_size, mode)
-            surface.blit(image, (self.pos[0] - small_size[0] / 2, self.pos[1] - small_size[1] / 2))
-            start = end
-            end += step
+        small_size = (132 * self.scale, 132 * self.scale)
+        self._draw_pie_slices(surface, small_size, (self.pos[0] - small_size[0] / 2, self.pos[1] - small_size[1] / 2))
 
         # Wheel logo
         # TODO: Change logo on MAX_ANGLE_INCREASE
-        self.img_wheel_logo = self.imagecache.wheel_logo
         logo_x = int(self.size[0] / 4)
         logo_y = int(self.size[1] / 4)
-        self.img_wheel_logo = pygame.transform.scale(self.img_wheel_logo, (logo_x, logo_y))
-        surface.blit(self.img_wheel_logo, (self.pos[0] - logo_x / 2, self.pos[1] - logo_y / 2 - 12))
+        if not self.img_wheel_logo:
+            self.img_wheel_logo = self.imagecache.get_image(self.appconfig.path_img_wheel_logo, (logo_x, logo_y), alpha=True)
+        surface.blit(self.img_wheel_logo, (self.pos[0] - logo_x / 2, self.pos[1] - logo_y / 2 - 12 * self.scale))
 
-        # Wheel stopper
+        # Wheel stopper pins, one per stopper angle along the rim
         wheel_stopper_color = colors.COLOR_SIENNA
+        pin_radius = max(2, int(round(5 * self.scale)))
+        pin_distance = self.radius - 8 * self.scale
+        for angle in range(0, 360, WheelPhysics.STOPPER_ANGLE):
+            x = self.pos[0] + pin_distance * math.cos(math.radians(angle))
+            y = self.pos[1] + pin_distance * math.sin(math.radians(angle))
+            pygame.draw.circle(surface, wheel_stopper_color, (int(x), int(y)), pin_radius, 0)
 
-        # North
-        north_x = int(self.pos[0])
-        north_y = 0 + 8
-        pygame.draw.circle(surface, wheel_stopper_color, (north_x, north_y), 5, 0)
-        # East
-        east_x = int(self.pos[0] + self.size[0] / 2) - 7
-        east_y = int(self.pos[1])
-        pygame.draw.circle(surface, wheel_stopper_color, (east_x, east_y), 5, 0)
-        # South
-        south_x = int(self.pos[0]) + 1
-        south_y = int(self.pos[1] + self.size[1] / 2) - 7
-        pygame.draw.circle(surface, wheel_stopper_color, (south_x, south_y), 5, 0)
-        # West
-        west_x = int(self.pos[0] - self.size[0] / 2) + 7
-        west_y = int(self.pos[1]) + 1
-        pygame.draw.circle(surface, wheel_stopper_color, (west_x, west_y), 5, 0)
-
-        # Calculation of a point on an arc:
-        # Let the coordinates of P1 be (xP1, yP1).
-        # Let the angle between the points P1 and P2 be θ.
-        # Then from the arc d you get, θ = d / r = 2πx. So, now, we have
-        # xP2 = xP1 + r * sinθ
-        # yP2 = yP1 − r * (1 − cosθ)
-
-        small_circle_radius = int(5 / 2)
-
-        # North-East
-        x1 = north_x + self.radius * math.sin(math.radians(45)) - small_circle_radius - 1
-        y1 = north_y + self.radius * (1 - math.cos(math.radians(45))) - 1
-        pygame.draw.circle(surface, wheel_stopper_color, (int(x1), int(y1)), 5, 0)
-        # South-East
-        x1 = east_x - self.radius * (1 - math.sin(math.radians(45))) + small_circle_radius + 1
-        y1 = east_y + self.radius * math.cos(math.radians(45)) - small_circle_radius - 2
-        pygame.draw.circle(surface, wheel_stopper_color, (int(x1), int(y1)), 5, 0)
-        # South-West
-        x1 = south_x - self.radius * math.sin(math.radians(45)) + small_circle_radius + 2
-        y1 = south_y - self.radius * (1 - math.cos(math.radians(45))) + small_circle_radius + 1
-        pygame.draw.circle(surface, wheel_stopper_color, (int(x1), int(y1)), 5, 0)
-        # North-West
-        x1 = west_x + self.radius * (1 - math.sin(math.radians(45))) - small_circle_radius / 2 + 0
-        y1 = west_y - self.radius * math.cos(math.radians(45)) + small_circle_radius + small_circle_radius / 2 + 1
-        pygame.draw.circle(surface, wheel_stopper_color, (int(x1), int(y1)), 5, 0)
+    def _get_segment_colors(self):
+        '''Returns one color per segment, neighbouring segments differ
 
-    def _draw_tasks(self, surface):
-        '''Draws all tasks
-        
-        :param surface: Surface to draw on
+        :return: List of colors
         '''
-        r = int(self.size[0] / 2 * 3 / 5)
-        # Helping circle
-        #pygame.gfxdraw.aacircle(surface, int(self.pos[0]), int(self.pos[1]), r, colors.COLOR_SGI_GRAY_92)
-        #logging.debug('Circle mid: {}, {}'.format(int(self.pos[0]), int(self.pos[1])))
+        if self.nr_of_segments <= len(self.WHEEL_COLORS):
+            return self.WHEEL_COLORS[:self.nr_of_segments]
 
-        angle_degree = 360 / 8
-        positions = {}
-        for i in range(0, 8):
-            _angle_corrected_radians = math.radians(angle_degree * (i + 1) - angle_degree / 2)
-            x, y = r * math.cos(_angle_corrected_radians), r * math.sin(_angle_corrected_radians)
-            logging.debug('{}. (x, y) = ({}, {})'.format(i, x, y))
-            positions[i] = {
-                'pos': (self.pos[0] + x, self.pos[1] + y),
-                'angle': (-20 - (46 * i))
-            }
-            logging.debug('Pos(x, y) = ({}, {}), Angle = {}'.format(positions[i]['pos'][0], positions[i]['pos'][1], positions[i]['angle']))
-            # Helping dots
-            #pygame.gfxdraw.filled_circle(surface, int(positions[i]['pos'][0]), int(positions[i]['pos'][1]), 5, colors.COLOR_CRIMSON)
-
-        for i, task in enumerate(self.tasks.tasks):
-            if i < 8:
-                tpos = positions[i]['pos']
-                angle = positions[i]['angle']
-                _task = (task[:(self.appconfig.task_max_length - 3)] + '...') if len(task) > self.appconfig.task_max_length else task
-                text = Text(self.appconfig, self.appconfig.size_tasks, tpos, _task, self.appconfig.fontsize_tasks, colors.COLOR_WHITE, rotation_angle=angle)
-                text.draw(surface)
-
-    def _update_spinning_direction(self):
-        '''Updates the spinning direction'''
-        self.spinning_direction_last.append(self.spinning_direction)
-        if len(self.spinning_direction_last) > 20:
-            self.spinning_direction_last = self.spinning_direction_last[20:]
-        if self.angle_increase >= -self.INCREASE_ON_DRAG and self.angle_increase <= self.INCREASE_ON_DRAG:
-            self.spinning_direction = SpinningDirection.NONE
-        elif self.angle_increase > 0:
-            self.spinning_direction = SpinningDirection.RIGHT
-        else:
-            self.spinning_direction = SpinningDirection.LEFT
-
-    def _update_angle_increase_on_mouse_pressed(self, mouse_x, mouse_y):
-        '''Updates the angle increase on mouse pressed'''
-        in_left_half = mouse_x <= self.center[0]
-        if self.last_mouse_y < mouse_y:
-            self.angle_increase += -self.INCREASE_ON_DRAG if in_left_half else self.INCREASE_ON_DRAG
-        else:
-            self.angle_increase += self.INCREASE_ON_DRAG if in_left_half else -self.INCREASE_ON_DRAG
+        segment_colors = []
+        for i in range(self.nr_of_segments):
+            # Golden ratio steps spread the hues evenly for any number of segments
+            hue = (i * 0.618033988749895) % 1
+            r, g, b = colorsys.hsv_to_rgb(hue, 0.6, 0.9)
+            segment_colors.append((int(r * 255), int(g * 255), int(b * 255)))
+        return segment_colors
 
-    def _get_angle_decrease_factor(self):
-        '''Returns the angle decrease factor for "smoothing out"
+    def _draw_pie_slices(self, surface, size, pos):
+        '''Draws one pie slice per segment
 
-        :return: Angle decrease factor
+        :param surface: The surface to draw on
+        :param size: The size of the pie
+        :param pos: The top left position of the pie
         '''
-        if not self.is_spinning():
-            return 1.0
-
-        if self.is_spinning_right():
-            if self.angle_increase <= 0.4:
-                value = 0.08
-            elif self.angle_increase <= 0.5:
-                value = 0.09
-            elif self.angle_increase <= 0.6:
-                value = 0.1
-            elif self.angle_increase <= 0.7:
-                value = 0.11
-            elif self.angle_increase <= 0.8:
-                value = 0.125
-            elif self.angle_increase <= 0.9:
-                value = 0.15
-            elif self.angle_increase <= 1:
-                value = 0.22
-            elif self.angle_increase <= 1.1:
-                value = 0.31
-            elif self.angle_increase <= 1.2:
-                value = 0.4
-            elif self.angle_increase <= 1.3:
-                value = 0.5
-            elif self.angle_increase <= 1.4:
-                value = 0.6
-            elif self.angle_increase <= 2:
-                value = 0.7
-            elif self.angle_increase <= 3:
-                value = 0.8
-            elif self.angle_increase <= 4:
-                value = 0.9
-            elif self.angle_increase <= 5:
-                value = 0.95
-            else:
-                value = 1
-        else:
-            if self.angle_increase >= -0.4:
-                value = 0.08
-            elif self.angle_increase >= -0.5:
-                value = 0.09
-            elif self.angle_increase >= -0.6:
-                value = 0.1
-            elif self.angle_increase >= -0.7:
-                value = 0.11
-            elif self.angle_increase >= -0.8:
-                value = 0.125
-            elif self.angle_increase >= -0.9:
-                value = 0.15
-            elif self.angle_increase >= -1:
-                value = 0.22
-            elif self.angle_increase >= -1.1:
-                value = 0.31
-            elif self.angle_increase >= -1.2:
-                value = 0.4
-            elif self.angle_increase >= -1.3:
-                value = 0.5
-            elif self.angle_increase >= -1.4:
-                value = 0.6
-            elif self.angle_increase >= -2:
-                value = 0.7
-            elif self.angle_increase >= -3:
-                value = 0.8
-            elif self.angle_increase >= -4:
-                value = 0.9
-            elif self.angle_increase >= -5:
-                value = 0.95
-            else:
-                value = 1
-
-        return value
-
-    def _get_angle_increase(self):
-        '''Returns the angle increase value, multiplies a factor for "smoothing out"
-
-        :return: Angle increase value
+        segment_colors = self._get_segment_colors()
+        radius_x, radius_y = size[0] / 2, size[1] / 2
+        center_x, center_y = pos[0] + radius_x, pos[1] + radius_y
+
+        clip = surface.get_clip()
+
+        for sli in range(self.nr_of_segments):
+            start = math.radians(self.segment_bounds[sli - 1] if sli else 0)
+            end = math.radians(self.segment_bounds[sli])
+            if end <= start:
+                continue
+            # Draw straight into the surface, one point every ~2 pixels along the arc
+            nr_of_arc_points = max(2, int(math.ceil((end - start) * max(radius_x, radius_y) / 2)) + 1)
+            points = [(center_x, center_y)]
+            for i in range(nr_of_arc_points):
+                a = start + (end - start) * i / (nr_of_arc_points - 1)
+                points.append((center_x + radius_x * math.cos(a), center_y + radius_y * math.sin(a)))
+            xs = [p[0] for p in points]
+            ys = [p[1] for p in points]
+            if not clip.colliderect(pygame.Rect(min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)):
+                continue
+            pygame.draw.polygon(surface, segment_colors[sli], points, 0)
+
+    def _get_labels(self, tasks):
+        '''Returns the labels of the tasks
+
+        :param tasks: List of tasks
+        :return: List of texts
         '''
-        value = self.DECREASE_ON_DRAG_STOP * self._get_angle_decrease_factor()
-
-        return -1 * value if self.is_spinning_right() else value
-
-    def _update_angle_increase_on_mouse_not_pressed(self):
-        '''Updates the angle increase on mouse not pressed'''
-        self.angle_increase += self._get_angle_increase()
-
-        # Decrease speed every stopper (~= every 45 degrees) a bit more
-        if self._is_45_deg():
-            factor = 1 if self.is_spinning_right() else -1
-            self.angle_increase -= factor * \
-                random.uniform(self.DECREASE_ON_STOPPER_MIN, self.DECREASE_ON_STOPPER_MAX)
-
-        # TODO: Spin back on stopper bump
-
-        if self.spinning_direction == SpinningDirection.NONE:
-            self.angle_increase = 0
-        elif self.spinning_direction == SpinningDirection.RIGHT and self.angle_increase <= self.THRESHOLD_NOT_SPINNING:
-            self.angle_increase = 0
-        elif self.spinning_direction == SpinningDirection.LEFT and self.angle_increase >= -self.THRESHOLD_NOT_SPINNING:
-            self.angle_increase = 0
+        r = int(self.size[0] / 2 * 3 / 5)
+        # Helping circle
+        #pygame.gfxdraw.aacircle(surface, int(self.pos[0]), int(self.pos[1]), r, colors.COLOR_SGI_GRAY_92)
+        #logging.debug('Circle mid: {}, {}'.format(int(self.pos[0]), int(self.pos[1])))
 
-    def _update_angle_increase(self):
-        '''Updates the angle increase'''
-        mouse_pressed, _2, _3 = pygame.mouse.get_pressed()
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+        fontsize_max = max(self.appconfig.fontsize_tasks_min, int(self.appconfig.fontsize_tasks * self.scale))
 
-        self._update_spinning_direction()
+        labels = []
+        for i, entry in enumerate(tasks):
+            task, _ = Tasks.parse_entry(entry)
+            start = self.segment_bounds[i - 1] if i else 0
+            angle_degree = self.segment_bounds[i] - start
+            # Shrink the labels to the arc available in the segment
+            fontsize = min(fontsize_max, max(self.appconfig.fontsize_tasks_min, int(math.radians(angle_degree) * r * 0.8)))
+            _angle_corrected_radians = math.radians(start + angle_degree / 2)
+            x, y = r * math.cos(_angle_corrected_radians), r * math.sin(_angle_corrected_radians)
+            tpos = (self.pos[0] + x, self.pos[1] + y)
+            angle = -(start + angle_degree / 2)
+            _task = (task[:(self.appconfig.task_max_length - 3)] + '...') if len(task) > self.appconfig.task_max_length else task
+            labels.append(Text(self.appconfig, self.appconfig.size_tasks, tpos, _task, fontsize, colors.COLOR_WHITE, rotation_angle=angle))
+        return labels
 
-        if mouse_pressed:
-            self._update_angle_increase_on_mouse_pressed(mouse_x, mouse_y)
-        else:
-            self._update_angle_increase_on_mouse_not_pressed()
+    def _draw_tasks(self, surface):
+        '''Draws all tasks
+        
+        :param surface: Surface to draw on
+        '''
+        self._invalidate_rotations()
 
-        if self.angle_increase > self.MAX_ANGLE_INCREASE:
-            self.angle_increase = self.MAX_ANGLE_INCREASE
-        if self.angle_increase < -1 * self.MAX_ANGLE_INCREASE:
-            self.angle_increase = -1 * self.MAX_ANGLE_INCREASE
+        self.tasks_drawn = list(self.tasks.tasks)
+        labels = self._get_labels(self.tasks_drawn)
+        self.label_rects = [text.get_rect() for text in labels]
+        for text in labels:
+            text.draw(surface)
 
-        self.last_mouse_x, self.last_mouse_y = mouse_x, mouse_y
+    def _redraw(self, rect=None):
+        '''Redraws the wheel face in place
 
-    def _update_angle(self):
-        '''Updates the angle'''
-        self.angle_mod_45 = self.angle % 45
-        self.angle -= self.angle_increase
-        self.angle = self.angle % 360
+        :param rect: The area to redraw, defaults to the whole face
+        '''
+        self.surface.set_clip(rect)
+        self.surface.fill((0, 0, 0, 0))
+        self._draw_graphics(self.surface)
+        self._draw_tasks(self.surface)
+        self.surface.set_clip(None)
+
+    def update_tasks(self):
+        '''Updates the wheel face to changed tasks, redraws only the changed labels if possible'''
+        tasks = self.tasks.tasks
+        if not self.facecache:
+            self._update_face(tasks)
+            return
+
+        face_key = self._get_face_key(tasks)
+        if face_key == self.face_key:
+            return
+        if face_key in self.facecache or self.facecache.get_users(self.face_key) > 1:
+            # Other wheels still show the current face
+            self._release_face()
+            self.nr_of_segments = face_key[1]
+            self.face_key = face_key
+            self._set_face(self.facecache.acquire(self.face_key, self._build_face))
+            return
+
+        self._update_face(tasks)
+        self.facecache.replace(self.face_key, face_key, self._get_face())
+        self.face_key = face_key
+
+    def _update_face(self, tasks):
+        '''Redraws the face in place for the tasks
+
+        :param tasks: List of tasks
+        '''
+        nr_of_segments = max(len(tasks), self.appconfig.min_segments)
+        if nr_of_segments != self.nr_of_segments:
+            logging.info('Redrawing wheel with {} segments'.format(nr_of_segments))
+            self.nr_of_segments = nr_of_segments
+            self._redraw()
+            return
+        if Tasks.get_weights(tasks) != Tasks.get_weights(self.tasks_drawn):
+            logging.info('Redrawing wheel with changed weights')
+            self._redraw()
+            return
+
+        label_rects = self.label_rects
+        changed = [i for i in range(nr_of_segments) if self._get_task(self.tasks_drawn, i) != self._get_task(tasks, i)]
+        logging.info('Redrawing {} changed tasks'.format(len(changed)))
+        if not changed:
+            return
+        if len(changed) > self.MAX_PARTIAL_REDRAWS:
+            self._redraw()
+            return
+
+        # Redraw where the old and the new labels are
+        new_label_rects = [text.get_rect() for text in self._get_labels(tasks)]
+        for i in changed:
+            rects = [r for r in (self._get_label_rect(label_rects, i), self._get_label_rect(new_label_rects, i)) if r]
+            if rects:
+                self._redraw(rects[0].unionall(rects[1:]))
+
+    def _get_task(self, tasks, index):
+        '''Returns the task at the given index
+
+        :param tasks: List of tasks
+        :param index: The index
+        :return: The task or None
+        '''
+        return tasks[index] if index < len(tasks) else None
 
-    def _is_45_deg(self):
-        '''Returns whether wheel is on 45 degrees
+    def _get_label_rect(self, label_rects, index):
+        '''Returns the area of the label at the given index
 
-        :return: True if wheel is on 45 degrees, False else
+        :param label_rects: List of label areas
+        :param index: The index
+        :return: The area or None
         '''
-        factor = 1 if self.is_spinning_right() else -1
-        incdec = 3 + factor * self.angle_increase
-        d1 = False
-        d2 = False
-        if self.is_spinning_right():
-            d1 = self.angle_mod_45 > incdec
-            d2 = self.angle_mod_45 - self.angle_increase < incdec
-        elif self.is_spinning_left():
-            d1 = self.angle_mod_45 < (45 - incdec)
-            d2 = self.angle_mod_45 + factor * \
-                self.angle_increase > (45 - incdec)
-        return d1 and d2
+        return label_rects[index] if index < len(label_rects) else None
+
+    def _invalidate_rotations(self):
+        '''Invalidates the cached rotations of the wheel face'''
+        self.angle_rotated = None
+        self.angle_drawn = None
+        if self.rotationcache:
+            self.rotationcache.invalidate()
+        if self.rotator:
+            self.rotator.invalidate()
+
+    def _rotate(self, angle):
+        '''Returns the wheel face rotated by the given angle
+
+        :param angle: The angle in degrees
+        :return: The rotated surface
+        '''
+        if self.rotationcache:
+            return self.rotationcache.get(angle)
+        if self.rotator:
+            if self.rotated_image is None or self.rotated_image.get_size() != self.rotator.size:
+                self.rotated_image = self.rotator.create_image()
+            return self.rotator.rotate(angle, self.rotated_image)
+        return pygame.transform.rotozoom(self.surface, angle, 1)
+
+    def _poll_mouse(self):
+        '''Returns the mouse state
+
+        :return: Tuple of the mouse button, mouse x and mouse y
+        '''
+        mouse_button, _2, _3 = pygame.mouse.get_pressed()
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        return mouse_button, mouse_x, mouse_y
 
     def _play_sound_stopper(self):
         self.soundcache.play(self.soundcache.sound_stopper)
@@ -396,50 +485,111 @@ class Wheel(Entity):
 
         :return: True if the wheel is spinning, False else
         '''
-        return self.spinning_direction != SpinningDirection.NONE
+        return self.physics.is_spinning()
 
-    def is_spinning_right(self):
-        '''Returns whether the wheel is spinning in the right direction
+    def _get_interpolated_angle(self, alpha):
+        '''Returns the angle between the last two simulation steps
 
-        :return: True if the wheel is spinning in the right direction, False else
+        :param alpha: Progress between the last two simulation steps
+        :return: The interpolated angle
         '''
-        return self.spinning_direction == SpinningDirection.RIGHT
+        delta = (self.physics.get_angle() - self.angle_previous + 180) % 360 - 180
+        return (self.angle_previous + delta * alpha) % 360
 
-    def is_spinning_left(self):
-        '''Returns whether the wheel is spinning in the left direction
+    def get_task(self, segment):
+        '''Returns the task of the segment
 
-        :return: True if the wheel is spinning in the left direction, False else
+        :param segment: The segment index
+        :return: The task or None if the segment is empty
         '''
-        return self.spinning_direction == SpinningDirection.LEFT
+        entry = self._get_task(self.tasks_drawn, segment)
+        return Tasks.parse_entry(entry)[0] if entry is not None else None
 
-    def get_nr_of_rounds_not_spinning(self):
-        '''Returns how many rounds the wheel is not spinning
+    def predict_result(self):
+        '''Predicts where the wheel comes to rest if it gets no more input
 
-        :return: How many rounds the wheel is not spinning, if was spinning
+        :return: Tuple of the resting angle, the segment index and the task
         '''
-        resting_rounds = 0
-        for d in reversed(self.spinning_direction_last):
-            if d == SpinningDirection.NONE:
-                resting_rounds = resting_rounds + 1
-            else:
-                return resting_rounds, True
+        angle, _ = self.physics.predict()
+        segment = self.physics.get_segment(self.nr_of_segments, angle, self.segment_bounds)
+        return angle, segment, self.get_task(segment)
 
-        return resting_rounds, False
+    def _draw_fair(self):
+        '''Draws the task by its weight and steers the wheel to come to rest on it'''
+        segment = self.alias_table.draw(self.physics.rng)
+        if self.physics.steer_to_segment(segment, self.segment_bounds):
+            logging.debug('Steering to segment {}'.format(segment + 1))
 
     # @Override
-    def update(self):
-        self._update_angle_increase()
-        self.image = pygame.transform.rotozoom(self.surface, self.angle, 1)
-        self._update_angle()
+    def fixed_update(self):
+        mouse_button, mouse_x, mouse_y = self.input_source()
+        if mouse_button and not self.mouse_button_last:
+            self.grabbed = self.input_rect is None or self.input_rect.collidepoint(mouse_x, mouse_y)
+        self.mouse_button_last = mouse_button
+        mouse_pressed = mouse_button and self.grabbed
+
+        self.angle_previous = self.physics.get_angle()
+        released = not mouse_pressed and self.mouse_pressed_last
+        if released:
+            self.nr_of_spin_steps = 0
+            self.spin_seed = self.physics.reseed()
+            if self.alias_table:
+                self._draw_fair()
+        on_stopper = False
+        if self.appconfig.spin_mode == 'instant' and released:
+            # Skip the animation, jump to where the wheel comes to rest
+            self.physics.step(mouse_pressed, mouse_x, mouse_y)
+            self.nr_of_spin_steps = 1 + self.physics.run_to_rest()
+            self.angle_previous = self.physics.get_angle()
+        else:
+            nr_of_steps = 1
+            if self.appconfig.spin_mode == 'fast' and not mouse_pressed:
+                nr_of_steps = self.appconfig.spin_fast_forward_factor
+            for _ in range(nr_of_steps):
+                on_stopper = self.physics.step(mouse_pressed, mouse_x, mouse_y) or on_stopper
+                if not mouse_pressed and self.physics.angle_increase:
+                    self.nr_of_spin_steps += 1
+        self.mouse_pressed_last = mouse_pressed
+
+        if on_stopper:
+            self._play_sound_stopper()
+        rounds_not_spinning, was_spinning = self.physics.get_nr_of_rounds_not_spinning()
+        if not self.physics.is_spinning() and was_spinning and rounds_not_spinning > 5:
+            segment = self.physics.get_segment(self.nr_of_segments, bounds=self.segment_bounds)
+            task = self.get_task(segment)
+            logging.info('Wheel stopped on segment {}: {}'.format(segment + 1, task))
+            if self.spinhistory:
+                self.spinhistory.add(self.spin_seed, task, self.nr_of_spin_steps / self.appconfig.physics_rate)
+            self._play_sound_tada()
+            self.physics.reset_spinning_direction_last()
+
+    # @Override
+    def update(self, alpha=1.0):
+        angle = self._get_interpolated_angle(alpha)
+        if angle == self.angle_rotated:
+            return
+        self.image = self._rotate(angle)
+        self.angle_rotated = angle
         x, y = self.rect.center
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
-        if self._is_45_deg():
-            self._play_sound_stopper()
-        rounds_not_spinning, was_spinning = self.get_nr_of_rounds_not_spinning()
-        if not self.is_spinning() and was_spinning and rounds_not_spinning > 5:
-            self._play_sound_tada()
-            self.spinning_direction_last = []
+
+    # @Override
+    def is_idle(self):
+        # At rest, not held, the result announced and the resting angle on screen
+        _, was_spinning = self.physics.get_nr_of_rounds_not_spinning()
+        return self.physics.angle_increase == 0 and not self.mouse_button_last and not was_spinning \
+            and self.angle_rotated == self.physics.get_angle()
+
+    # @Override
+    def get_dirty_rects(self):
+        if self.angle_drawn == self.angle_rotated:
+            return []
+        self.angle_drawn = self.angle_rotated
+        # Only the wheel disc changes when rotating, the rotated image's corners are transparent
+        rect = pygame.Rect((0, 0), self.size)
+        rect.center = self.rect.center
+        return [rect]
 
     # @Override
     def draw(self, surface):
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - AliasTable'''
+
+import logging
+import random
+
+
+class AliasTable:
+    '''Draws indices in proportion to their weights in constant time (Vose's alias method)
+
+    Every index gets a column of height 1, split between the index and one alias, so a draw picks
+    a column uniformly and then one of its two parts. Building the table is linear in the number of weights.
+    '''
+
+    def __init__(self, weights):
+        '''Initializes, builds the table
+
+        :param weights: The non-negative weights, at least one positive
+        '''
+        logging.debug('Initializing AliasTable')
+
+        self.nr_of_entries = len(weights)
+        total = float(sum(weights))
+        if not self.nr_of_entries or total <= 0:
+            raise ValueError('At least one positive weight is required')
+
+        self.probabilities = [max(0.0, float(w)) * self.nr_of_entries / total for w in weights]
+        self.aliases = list(range(self.nr_of_entries))
+
+        small = [i for i, p in enumerate(self.probabilities) if p < 1]
+        large = [i for i, p in enumerate(self.probabilities) if p >= 1]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            # The rest of the column of s is filled up by l
+            self.aliases[s] = l
+            self.probabilities[l] += self.probabilities[s] - 1
+            if self.probabilities[l] < 1:
+                small.append(l)
+            else:
+                large.append(l)
+        # What is left is full up to rounding errors
+        for i in small + large:
+            self.probabilities[i] = 1.0
+
+    def __len__(self):
+        return self.nr_of_entries
+
+    def draw(self, rng=random):
+        '''Draws an index
+
+        :param rng: The random number generator
+        :return: The index
+        '''
+        i = int(rng.random() * self.nr_of_entries)
+        return i if rng.random() < self.probabilities[i] else self.aliases[i]
@@ -26,12 +26,15 @@ class AppConfig:
         if not os.path.exists(wof_dir):
             os.makedirs(wof_dir)
         self.tasksFilePath = '{}/tasks.wfn'.format(wof_dir)
+        self.cache_dir_path = '{}/cache'.format(wof_dir)
 
         self.i18n = I18n(language='deDe')
 
         self.fontname = 'Comic Sans Ms'
 
         self.fontsize_tasks = 12
+        self.fontsize_tasks_min = 6
+        self.text_cache_max_entries = 4096
         self.task_max_length = 38
 
         self.size_tasks = (80, 80)
@@ -40,13 +43,105 @@ class AppConfig:
         self.path_img_wheel_logo = 'resources/base/wheel-logo.png'
         self.path_img_background = 'resources/base/background.jpeg'
 
+        # Keep decoded and scaled images on disk
+        self.image_disk_cache_enabled = True
+        # The least recently used images are deleted beyond this size, a 1920x1080 background takes about 6MB
+        self.image_disk_cache_max_bytes = 128 * 1024 * 1024
+        # Scaled images kept in memory, e.g. the background per window size
+        self.image_cache_max_entries = 16
+
         self.path_sound_stopper = 'resources/base/stopper.wav'
         self.path_sound_tada = 'resources/base/tada.wav'
 
+        # A smaller mixer buffer lowers the latency, but may glitch on slow machines
+        self.mixer_frequency = 44100
+        self.mixer_buffer = 512
+        self.mixer_num_channels = 8
+        # Sounds of higher priority take over the channels of lower ones, the rate is in plays per second
+        self.sound_stopper_priority = 0
+        self.sound_stopper_max_rate = 20
+        self.sound_tada_priority = 10
+        self.sound_tada_max_rate = 1
+
         self.bg_color = colors.COLOR_BLACK
         self.display_bg_image = True
 
+        # 'memory' reads all tasks, 'mmap' indexes a memory-mapped tasks file and shows a page of it
+        self.tasks_backend = 'memory'
+        self.tasks_page_size = 1000
         self.randomize_tasks = False
+        # Reload the tasks when the tasks file changes
+        self.watch_tasks = True
+        self.tasks_watch_interval = 1.0
+        # Task edits are appended to a journal, the tasks file is rewritten once the journal is this large relative to it
+        self.tasks_journal_max_ratio = 0.5
+        # The wheel has one segment per task, but at least this many
+        self.min_segments = 8
+        # 'physics' lets the braking decide, 'fair' draws the task by its weight and steers the wheel there
+        self.draw_mode = 'physics'
+
+        # Records per-entity frame timings, F3 toggles the overlay, exports every interval seconds (0 to disable)
+        self.profiler_enabled = False
+        self.profiler_hud_visible = False
+        self.profiler_hud_fontname = 'Courier New'
+        self.profiler_hud_fontsize = 14
+        self.profiler_window = 600
+        self.profiler_export_interval = 60
+        self.profiler_export_format = 'json'
+        self.profiler_export_dir = '{}/perf'.format(wof_dir)
+
+        # Skipping the task editor also skips loading Tk
+        self.show_task_editor = True
+        # Visible rows of the task editor, the other tasks are scrolled into them
+        self.task_editor_rows = 20
+        self.startup_report = True
 
         self.screen_size = (800, 800)
+        # The layout follows the window size, it is redone once the size stopped changing for resize_debounce seconds
+        self.resizable = True
+        self.resize_debounce = 0.25
         self.fps = 60
+        # The wheel physics are tuned to 60 steps per second
+        self.physics_rate = 60
+        self.physics_max_steps_per_frame = 10
+        # 'animate' the whole spin, 'fast' forward it or show the result 'instant'ly on release
+        self.spin_mode = 'animate'
+        # Up to 8, the wheel turns less than half a turn per step then
+        self.spin_fast_forward_factor = 4
+        self.dirty_rects = True
+        # Sleeps until there is input while nothing moves, waking up at least every idle_max_wait seconds
+        self.idle_enabled = True
+        self.idle_max_wait = 1.0
+
+        # Wheels are laid out in a grid, wheels with the same tasks share their face
+        self.nr_of_wheels = 1
+        self.face_cache_max_unused = 4
+
+        # Seeds the task shuffling and the wheels, None draws a new seed per session
+        self.seed = None
+        # Records the input of every session to replay it with Replay.py, the tasks are not reloaded while recording
+        self.record_sessions = False
+        self.recordings_dir = '{}/recordings'.format(wof_dir)
+        # Logs the result of every spin, see History.py, the results are written in batches every interval seconds
+        self.spin_history_enabled = True
+        self.spin_history_path = '{}/history/spins.wfh'.format(wof_dir)
+        self.spin_history_flush_interval = 1.0
+
+        # Headless spin server, see Server.py
+        self.server_host = '127.0.0.1'
+        self.server_port = 8080
+        self.server_max_sessions = 1000
+        self.server_read_timeout = 10
+        # Angle frames per second when streaming a spin
+        self.server_frame_rate = 30
+
+        # Keeps rotated wheel faces, a revolution has 360 / resolution of them, at 0.5 degrees 720.
+        # A rotated 700px face takes about 3 MB, so the budget holds about 40, the angles first cached stay until the face changes.
+        # Most hits come from slow wheels showing the same angle step in consecutive frames, about 13% of the rotations of a spin
+        self.rotation_cache_enabled = True
+        self.rotation_cache_resolution = 0.5
+        self.rotation_cache_max_bytes = 128 * 1024 * 1024
+        # 'rotozoom' or 'surfarray', the latter remaps only the wheel disc with NumPy, using tables computed once per wheel size
+        self.rotation_engine = 'rotozoom'
+        # 'nearest' or 'bilinear', for the surfarray engine
+        self.rotation_quality = 'bilinear'
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - FrameProfiler'''
+
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+
+
+class FrameProfiler:
+    '''Records the durations of the frame phases over a rolling window of frames'''
+
+    # Upper bounds of the histogram buckets in milliseconds
+    HISTOGRAM_BOUNDS = [0.25, 0.5, 1, 2, 4, 8, 16.7, 33.3, 66.7, float('inf')]
+
+    def __init__(self, appconfig):
+        '''Initializes
+
+        :param appconfig: The app config
+        '''
+        logging.debug('Initializing FrameProfiler')
+
+        self.appconfig = appconfig
+
+        # Name -> durations in seconds, one per frame
+        self.samples = {}
+        self.frame = {}
+        self.last_export = time.perf_counter()
+
+    def add(self, name, duration):
+        '''Adds a duration to the current frame
+
+        :param name: The name of the phase
+        :param duration: The duration in seconds
+        '''
+        self.frame[name] = self.frame.get(name, 0) + duration
+
+    def end_frame(self):
+        '''Moves the durations of the current frame into the rolling window'''
+        for name, duration in self.frame.items():
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = deque(maxlen=self.appconfig.profiler_window)
+                self.samples[name] = samples
+            samples.append(duration)
+        self.frame = {}
+
+    def get_statistics(self):
+        '''Returns statistics and histograms of the rolling window
+
+        :return: Dictionary of name -> statistics in milliseconds
+        '''
+        statistics = {}
+        for name, samples in self.samples.items():
+            values = sorted(s * 1000 for s in samples)
+            histogram = [0] * len(self.HISTOGRAM_BOUNDS)
+            bucket = 0
+            for value in values:
+                while value > self.HISTOGRAM_BOUNDS[bucket]:
+                    bucket += 1
+                histogram[bucket] += 1
+            statistics[name] = {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': values[int(0.5 * (len(values) - 1))],
+                'p90': values[int(0.9 * (len(values) - 1))],
+                'p99': values[int(0.99 * (len(values) - 1))],
+                'max': values[-1],
+                'histogram': histogram
+            }
+        return statistics
+
+    def export_if_due(self):
+        '''Exports the statistics if the export interval passed'''
+        if not self.appconfig.profiler_export_interval:
+            return
+
+        now = time.perf_counter()
+        if now - self.last_export >= self.appconfig.profiler_export_interval:
+            self.last_export = now
+            self.export()
+
+    def export(self):
+        '''Exports the statistics as JSON or CSV into the export directory'''
+        path_dir = self.appconfig.profiler_export_dir
+        extension = 'csv' if self.appconfig.profiler_export_format == 'csv' else 'json'
+        path = os.path.join(path_dir, 'frames-{}.{}'.format(time.strftime('%Y-%m-%d-%H-%M-%S'), extension))
+        statistics = self.get_statistics()
+
+        try:
+            if not os.path.exists(path_dir):
+                os.makedirs(path_dir)
+            with open(path, 'w', newline='') as f:
+                if extension == 'csv':
+                    bounds = ['<={}'.format(b) for b in self.HISTOGRAM_BOUNDS]
+                    writer = csv.writer(f)
+                    writer.writerow(['name', 'count', 'mean', 'p50', 'p90', 'p99', 'max'] + bounds)
+                    for name, s in statistics.items():
+                        writer.writerow([name, s['count'], s['mean'], s['p50'], s['p90'], s['p99'], s['max']] + s['histogram'])
+                else:
+                    json.dump({'histogram_bounds': self.HISTOGRAM_BOUNDS[:-1], 'phases': statistics}, f, indent=2)
+            logging.debug('Exported frame statistics to "{}"'.format(path))
+        except Exception as e:
+            logging.error('Error exporting frame statistics "{}": {}'.format(path, e))
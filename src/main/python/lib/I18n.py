@@ -16,12 +16,16 @@ class I18n:
 
     _translations_deDe = {
         'APP.NAME': 'Wheel of Fun',
-        'BUTTON.TASKS.OK': 'Ok'
+        'BUTTON.TASKS.OK': 'Ok',
+        'BUTTON.TASKS.ADD': 'Aufgabe hinzufügen',
+        'LABEL.TASKS.SEARCH': 'Suche:'
     }
 
     _translations_enUs = {
         'APP.NAME': 'Wheel of Fun',
-        'BUTTON.TASKS.OK': 'Ok'
+        'BUTTON.TASKS.OK': 'Ok',
+        'BUTTON.TASKS.ADD': 'Add task',
+        'LABEL.TASKS.SEARCH': 'Search:'
     }
 
     def __init__(self, language='enUs'):
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - MappedTasks'''
+
+import logging
+import mmap
+import os
+import random
+import re
+import struct
+
+import numpy as np
+
+from lib.AliasTable import AliasTable
+from lib.Tasks import Tasks
+
+
+class MappedTasks:
+    '''The tasks reader for very large task files
+
+    Memory-maps the tasks file and keeps only an index of line offsets, which is persisted next to the file.
+    The journal of task changes written by Tasks is applied to the file before mapping it.
+    '''
+
+    INDEX_MAGIC = b'WFNIDX01'
+    # Magic, tasks file size, tasks file modification time, number of tasks
+    INDEX_HEADER = struct.Struct('<8sQQQ')
+    # The index of the non-whitespace bytes of a chunk takes up to 8 bytes per byte of it
+    CHUNK_SIZE = 1024 * 1024
+    WHITESPACE = b' \t\r\n\x0b\x0c'
+    # The weight at the end of a task line, see Tasks.WEIGHT_PATTERN
+    WEIGHT_PATTERN = re.compile(rb';[ \t]*weight[ \t]*=[ \t]*(\d+(?:\.\d*)?|\.\d+)[ \t\r]*$', re.IGNORECASE | re.MULTILINE)
+
+    def __init__(self, appconfig, seed=None):
+        '''Initializes the tasks reader
+
+        :param appconfig: The application config
+        :param seed: The seed for sampling the tasks
+        '''
+        logging.debug('Initializing MappedTasks')
+
+        self.appconfig = appconfig
+        self.rng = random.Random(seed)
+
+        self.tasks = []
+
+        self._file = None
+        self._mmap = None
+        self._starts = np.zeros(0, dtype=np.uint64)
+        self._ends = np.zeros(0, dtype=np.uint64)
+        # Built on the first weighted draw, None if all tasks weigh the same
+        self._alias_table = None
+        self._weights_scanned = False
+
+        self._init()
+
+    def __len__(self):
+        return len(self._starts)
+
+    def get(self, index):
+        '''Returns the task at the given index, without its weight
+
+        :param index: The task index
+        :return: The task
+        '''
+        return Tasks.parse_entry(self.get_entry(index))[0]
+
+    def get_entry(self, index):
+        '''Returns the task entry at the given index as in the file, with its weight
+
+        :param index: The task index
+        :return: The task entry
+        '''
+        return self._mmap[int(self._starts[index]):int(self._ends[index])].decode('utf-8', errors='replace')
+
+    def get_page(self, page, page_size=None):
+        '''Returns a page of tasks, without their weights
+
+        :param page: The page number, starting at 0
+        :param page_size: The page size, defaults to the configured one
+        :return: List of tasks
+        '''
+        return [self.get(i) for i in self._get_page_indices(page, page_size)]
+
+    def _get_page_indices(self, page, page_size=None):
+        '''Returns the task indices of a page
+
+        :param page: The page number, starting at 0
+        :param page_size: The page size, defaults to the configured one
+        :return: Range of task indices
+        '''
+        page_size = page_size or self.appconfig.tasks_page_size
+        start = page * page_size
+        return range(start, min(start + page_size, len(self)))
+
+    def get_weights(self):
+        '''Returns the weights of all tasks
+
+        Only the lines with a weight are parsed, found by one scan over the mapped file.
+
+        :return: Array of weights
+        '''
+        weights = np.ones(len(self), dtype=np.float64)
+        if not len(self):
+            return weights
+        positions = []
+        values = []
+        for match in self.WEIGHT_PATTERN.finditer(self._mmap):
+            positions.append(match.start())
+            values.append(float(match.group(1)))
+        if positions:
+            # The task whose line the weight is at the end of
+            indices = np.searchsorted(self._starts, np.array(positions, dtype=np.uint64), side='right') - 1
+            valid = (indices >= 0) & (np.array(positions, dtype=np.uint64) < self._ends[np.maximum(indices, 0)])
+            weights[indices[valid]] = np.array(values)[valid]
+        return weights
+
+    def draw(self, rng=random):
+        '''Returns a random task drawn by its weight
+
+        :param rng: The random number generator
+        :return: The task without its weight or None if there are no tasks
+        '''
+        if not len(self):
+            return None
+        if not self._weights_scanned:
+            weights = self.get_weights()
+            if (weights != 1).any() and weights.sum() > 0:
+                self._alias_table = AliasTable(weights.tolist())
+            self._weights_scanned = True
+        if self._alias_table:
+            return self.get(self._alias_table.draw(rng))
+        return self.get(rng.randrange(len(self)))
+
+    def sample(self, k, rng=random):
+        '''Returns k distinct uniformly drawn random tasks
+
+        :param k: The number of tasks
+        :param rng: The random number generator
+        :return: List of tasks without their weights
+        '''
+        return [self.get(i) for i in self._sample_indices(k, rng)]
+
+    def _sample_indices(self, k, rng=random):
+        '''Returns k distinct uniformly drawn task indices
+
+        :param k: The number of indices
+        :param rng: The random number generator
+        :return: List of task indices
+        '''
+        return rng.sample(range(len(self)), min(k, len(self)))
+
+    def save_tasks(self, tasks):
+        '''Sets new tasks
+
+        :param tasks: The new tasks
+        '''
+        if not self.appconfig.tasksFilePath:
+            return
+
+        self._close()
+        with open(self.appconfig.tasksFilePath, 'w') as f:
+            f.write('# One line per task\n')
+            for t in tasks:
+                f.write(t)
+                f.write('\n')
+        # The file contains all changes now
+        if os.path.exists(self._get_journal_path()):
+            os.remove(self._get_journal_path())
+        self._init()
+
+    def compact(self):
+        '''Applies the journal of task changes to the file, line by line, the file is never read in as a whole
+
+        Comments and empty lines are kept, deleted tasks are dropped and added tasks are appended.
+        '''
+        if not self.appconfig.tasksFilePath or not os.path.exists(self._get_journal_path()):
+            return
+
+        logging.info('Applying the task changes to "{}"'.format(self.appconfig.tasksFilePath))
+        changes = Tasks.read_journal(self._get_journal_path())
+        # Written next to the file and moved over it, readers never see a partial file
+        path_tmp = '{}.tmp'.format(self.appconfig.tasksFilePath)
+        with open(self.appconfig.tasksFilePath, 'r') as f, open(path_tmp, 'w') as f_tmp:
+            index = 0
+            line = ''
+            for line in f:
+                _line = line.strip()
+                if _line and not _line.startswith('#'):
+                    if index in changes:
+                        task = changes.pop(index)
+                        line = '{}\n'.format(task) if task else ''
+                    index += 1
+                f_tmp.write(line)
+            if line and not line.endswith('\n'):
+                f_tmp.write('\n')
+            # Indices past the end add tasks
+            for index in sorted(changes):
+                if changes[index]:
+                    f_tmp.write('{}\n'.format(changes[index]))
+        os.replace(path_tmp, self.appconfig.tasksFilePath)
+        os.remove(self._get_journal_path())
+
+    def _get_index_path(self):
+        '''Returns the path of the index file
+
+        :return: The index file path
+        '''
+        return '{}.idx'.format(self.appconfig.tasksFilePath)
+
+    def _get_journal_path(self):
+        '''Returns the path of the journal of task changes, see Tasks.get_journal_path
+
+        :return: The journal path
+        '''
+        return '{}.journal'.format(self.appconfig.tasksFilePath)
+
+    def _close(self):
+        '''Releases the memory-mapped file'''
+        self._starts = np.zeros(0, dtype=np.uint64)
+        self._ends = np.zeros(0, dtype=np.uint64)
+        self._alias_table = None
+        self._weights_scanned = False
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _load_index(self, stat):
+        '''Loads the persisted index if it is up to date
+
+        :param stat: The stat result of the tasks file
+        :return: True if the index was loaded, False else
+        '''
+        path = self._get_index_path()
+        if not os.path.exists(path):
+            return False
+
+        with open(path, 'rb') as f:
+            header = f.read(self.INDEX_HEADER.size)
+        if len(header) != self.INDEX_HEADER.size:
+            return False
+        magic, size, mtime_ns, count = self.INDEX_HEADER.unpack(header)
+        if magic != self.INDEX_MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+            return False
+
+        if count:
+            offsets = np.memmap(path, dtype=np.uint64, mode='r', offset=self.INDEX_HEADER.size, shape=(2, count))
+            self._starts, self._ends = offsets[0], offsets[1]
+        return True
+
+    def _save_index(self, stat):
+        '''Persists the index next to the tasks file
+
+        :param stat: The stat result of the tasks file
+        '''
+        path = self._get_index_path()
+        try:
+            with open(path, 'wb') as f:
+                f.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, len(self._starts)))
+                f.write(self._starts.astype('<u8').tobytes())
+                f.write(self._ends.astype('<u8').tobytes())
+        except Exception as e:
+            logging.error('Error saving index "{}": {}'.format(path, e))
+
+    def _build_index(self):
+        '''Builds the index of the stripped, non-empty, non-comment lines'''
+        data = np.frombuffer(self._mmap, dtype=np.uint8)
+        size = len(data)
+        whitespace = np.frombuffer(self.WHITESPACE, dtype=np.uint8)
+
+        starts = []
+        ends = []
+        chunk_start = 0
+        while chunk_start < size:
+            # Chunks end on line boundaries, the temporary arrays take up to about 10 times CHUNK_SIZE
+            chunk_end = size
+            if chunk_start + self.CHUNK_SIZE < size:
+                chunk_end = self._mmap.rfind(b'\n', chunk_start, chunk_start + self.CHUNK_SIZE) + 1 or size
+            chunk = data[chunk_start:chunk_end]
+
+            newlines = np.flatnonzero(chunk == ord('\n'))
+            line_starts = np.concatenate(([0], newlines + 1))
+            line_ends = np.concatenate((newlines, [len(chunk)]))
+            non_whitespace = np.flatnonzero(~np.isin(chunk, whitespace))
+            if len(non_whitespace):
+                first = np.searchsorted(non_whitespace, line_starts)
+                valid = first < len(non_whitespace)
+                first = non_whitespace[np.minimum(first, len(non_whitespace) - 1)]
+                valid &= first < line_ends
+                valid &= chunk[first] != ord('#')
+                last = non_whitespace[np.searchsorted(non_whitespace, line_ends) - 1]
+                starts.append((first[valid] + chunk_start).astype(np.uint64))
+                ends.append((last[valid] + 1 + chunk_start).astype(np.uint64))
+
+            chunk_start = chunk_end
+
+        # Release the buffer exports, the memory map cannot be closed otherwise
+        del data, chunk
+        if starts:
+            self._starts = np.concatenate(starts)
+            self._ends = np.concatenate(ends)
+
+    def _init(self):
+        '''Maps the file and loads or builds the index'''
+        self.tasks = []
+        self._close()
+
+        if not self.appconfig.tasksFilePath:
+            return
+
+        try:
+            # The index covers the file only
+            self.compact()
+            self._file = open(self.appconfig.tasksFilePath, 'rb')
+            stat = os.fstat(self._file.fileno())
+            if not stat.st_size:
+                return
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            if not self._load_index(stat):
+                logging.info('Building index for "{}"'.format(self.appconfig.tasksFilePath))
+                self._build_index()
+                self._save_index(stat)
+            logging.debug('Indexed {} tasks'.format(len(self)))
+
+            # Only a page of the tasks is shown on the wheel, as entries like Tasks.tasks, the wheel sizes the segments by their weights
+            if self.appconfig.randomize_tasks:
+                indices = self._sample_indices(self.appconfig.tasks_page_size, self.rng)
+            else:
+                indices = self._get_page_indices(0)
+            self.tasks = [self.get_entry(i) for i in indices]
+        except Exception as e:
+            logging.error('Error loading file "{}: {}"'.format(self.appconfig.tasksFilePath, e))
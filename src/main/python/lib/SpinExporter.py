@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - SpinExporter'''
+
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+from PIL import Image
+
+from lib.AppConfig import AppConfig
+
+# The scene of a worker process, set up once per process
+_scene = None
+
+
+def _init_worker(metadata, size, output_format, output_dir):
+    '''Sets up the headless scene of a worker process
+
+    :param metadata: The session metadata
+    :param size: The frame size or None for the screen size
+    :param output_format: The output format
+    :param output_dir: The directory of the image sequence
+    '''
+    global _scene
+    # Imported here, the GUI pulls in the whole app
+    from gui.GUI import GUI
+    gui = GUI.create_headless(AppConfig(), metadata)
+    _scene = (gui, size, output_format, output_dir)
+
+
+def _render_frames(frames):
+    '''Renders and compresses frames in a worker process
+
+    :param frames: List of (frame index, wheel angles)
+    :return: List of (frame index, image or file path)
+    '''
+    gui, size, output_format, output_dir = _scene
+
+    results = []
+    for index, angles in frames:
+        for wheel, angle in zip(gui.wheels, angles):
+            wheel.physics.angle = angle
+            wheel.physics.angle_offset = 0
+            wheel.angle_previous = angle
+            wheel.update(1.0)
+        for entity in gui.entities:
+            entity.draw(gui.screen)
+
+        surface = gui.screen
+        if size and tuple(size) != surface.get_size():
+            surface = pygame.transform.smoothscale(surface, size)
+        image = Image.frombytes('RGB', surface.get_size(), pygame.image.tostring(surface, 'RGB'))
+
+        if output_format == 'png':
+            path = os.path.join(output_dir, 'frame-{:05d}.png'.format(index))
+            # Compressing dominates the frame time, the fastest level is still lossless
+            image.save(path, compress_level=1)
+            results.append((index, path))
+        elif output_format == 'gif':
+            # GIF has up to 256 colors per frame, quantizing is the expensive part of encoding it
+            results.append((index, image.quantize(256, method=Image.Quantize.FASTOCTREE)))
+        else:
+            results.append((index, image))
+
+    return results
+
+
+class SpinExporter:
+    '''Renders spins off-screen and encodes them, spreads rendering and compression across processes'''
+
+    FORMATS = ('gif', 'webp', 'png')
+
+    def __init__(self, metadata, fps=30, size=None, workers=None, tail=1.0):
+        '''Initializes
+
+        :param metadata: The session metadata, see GUI.get_session_metadata
+        :param fps: The frames per second of the clip
+        :param size: The frame size or None for the screen size
+        :param workers: The number of worker processes, defaults to the number of CPUs
+        :param tail: The seconds to keep showing the result after the wheels came to rest
+        '''
+        logging.debug('Initializing SpinExporter')
+
+        self.metadata = metadata
+        self.fps = fps
+        self.size = size
+        self.workers = workers or os.cpu_count() or 1
+        self.tail = tail
+
+    def simulate(self, events=None, nr_of_steps=None, speed=None, max_steps=100000, resizes=None):
+        '''Runs the session headlessly and returns the wheel angles
+
+        The recorded resizes move the wheels like in the session, the frames are still rendered in the initial layout.
+
+        :param events: List of recorded (step, mouse state) events, optional
+        :param nr_of_steps: The number of steps to run, defaults to until the wheels came to rest
+        :param speed: The initial speed of all wheels in degrees per step, optional
+        :param max_steps: The maximum number of steps
+        :param resizes: List of recorded (step, window size) resizes, optional
+        :return: List of the wheel angles, initially and after every step
+        '''
+        from gui.GUI import GUI
+
+        appconfig = AppConfig()
+        appconfig.rotation_cache_enabled = False
+        gui = GUI.create_headless(appconfig, self.metadata)
+        if speed:
+            for wheel in gui.wheels:
+                wheel.physics.angle_increase = speed
+
+        events = events or []
+        resizes = resizes or []
+        trace = [gui.get_angles()]
+        mouse_state = (False, 0, 0)
+        event_index = 0
+        resize_index = 0
+        step = 0
+        while step < (nr_of_steps or max_steps):
+            while resize_index < len(resizes) and resizes[resize_index][0] <= step:
+                gui._resize(resizes[resize_index][1])
+                resize_index += 1
+            while event_index < len(events) and events[event_index][0] <= step:
+                mouse_state = events[event_index][1]
+                event_index += 1
+            gui._fixed_update(mouse_state)
+            trace.append(gui.get_angles())
+            step += 1
+            if not nr_of_steps and event_index >= len(events) and not mouse_state[0] \
+                    and all(wheel.physics.angle_increase == 0 for wheel in gui.wheels):
+                break
+        gui._quit()
+
+        logging.info('Simulated {} steps'.format(step))
+        return trace
+
+    def get_frames(self, trace):
+        '''Samples the wheel angles at the frame rate of the clip
+
+        :param trace: List of the wheel angles per step
+        :return: List of (frame index, wheel angles)
+        '''
+        physics_rate = self.metadata['physics_rate']
+        nr_of_frames = int(math.ceil((len(trace) - 1) / physics_rate * self.fps + self.tail * self.fps)) + 1
+
+        frames = []
+        for index in range(nr_of_frames):
+            position = min(index * physics_rate / self.fps, len(trace) - 1)
+            step = int(position)
+            alpha = position - step
+            angles = trace[step]
+            if alpha and step + 1 < len(trace):
+                # Interpolates along the shorter way around
+                angles = [(a + ((b - a + 180) % 360 - 180) * alpha) % 360 for a, b in zip(trace[step], trace[step + 1])]
+            frames.append((index, angles))
+        return frames
+
+    def export(self, frames, path, output_format):
+        '''Renders and encodes the frames
+
+        :param frames: List of (frame index, wheel angles)
+        :param path: The output file, the output directory for image sequences
+        :param output_format: 'gif', 'webp' or 'png'
+        '''
+        if output_format not in self.FORMATS:
+            raise ValueError('Unknown format "{}"'.format(output_format))
+
+        output_dir = path if output_format == 'png' else None
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        # Several chunks per worker to even out the load
+        chunk_size = max(1, int(math.ceil(len(frames) / (self.workers * 4))))
+        chunks = [frames[i:i + chunk_size] for i in range(0, len(frames), chunk_size)]
+        initargs = (self.metadata, self.size, output_format, output_dir)
+
+        logging.info('Rendering {} frames with {} workers'.format(len(frames), self.workers))
+        results = []
+        if self.workers <= 1:
+            _init_worker(*initargs)
+            for chunk in chunks:
+                results.extend(_render_frames(chunk))
+        else:
+            # Fresh processes, forking a process with SDL set up is not safe
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker, initargs=initargs) as executor:
+                for chunk_results in executor.map(_render_frames, chunks):
+                    results.extend(chunk_results)
+
+        if output_format == 'png':
+            logging.info('Wrote {} frames to "{}"'.format(len(results), output_dir))
+            return
+
+        images = [image for _, image in sorted(results, key=lambda result: result[0])]
+        duration = int(round(1000 / self.fps))
+        if output_format == 'gif':
+            images[0].save(path, save_all=True, append_images=images[1:], duration=duration, loop=0)
+        else:
+            images[0].save(path, save_all=True, append_images=images[1:], duration=duration, loop=0, quality=80, method=4)
+        logging.info('Wrote {} frames to "{}"'.format(len(images), path))
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - SpinHistory'''
+
+import bisect
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+
+
+class SpinHistory:
+    '''Append-only log of the spin results
+
+    The log holds one fixed-size record per spin. The task index points into a task table next to the log, one task per line,
+    so renaming a task does not rewrite the log. A sparse index next to the log holds the offset of the first record of every hour,
+    a query reads only the records of the hours it covers. The records are written in batches by a background thread.
+    '''
+
+    # Timestamp, seed, task index, duration
+    RECORD = struct.Struct('<dQIf')
+    # Hour since the epoch, offset of its first record
+    INDEX_ENTRY = struct.Struct('<QQ')
+    NO_TASK = 0xFFFFFFFF
+    HOUR = 3600
+
+    def __init__(self, path, flush_interval=1.0, read_only=False):
+        '''Initializes, opens the log
+
+        :param path: The log path
+        :param flush_interval: The seconds to collect records before writing them
+        :param read_only: Whether to only query the log, e.g. while the app writes it
+        '''
+        logging.debug('Initializing SpinHistory')
+
+        self.path = path
+        self.flush_interval = flush_interval
+        self.read_only = read_only
+
+        self.task_indices = {}
+        self.index_hours = []
+        self.index_offsets = []
+
+        self._records = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._index_file = None
+        self._tasks_file = None
+
+        if not read_only:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._load_tasks()
+        self._open()
+
+    def get_tasks_path(self):
+        '''Returns the path of the task table
+
+        :return: The task table path
+        '''
+        return '{}.tasks'.format(self.path)
+
+    def get_index_path(self):
+        '''Returns the path of the hourly index
+
+        :return: The index path
+        '''
+        return '{}.idx'.format(self.path)
+
+    def start(self):
+        '''Starts writing in the background'''
+        if self._thread or self.read_only:
+            return
+
+        self._thread = threading.Thread(target=self._run, name='SpinHistory', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        '''Writes the pending records and closes the log'''
+        if self._thread:
+            self._records.put(None)
+            self._thread.join()
+            self._thread = None
+        elif not self.read_only:
+            self._write(self._get_pending())
+        for f in (self._file, self._index_file, self._tasks_file):
+            if f:
+                f.close()
+
+    def add(self, seed, task, duration, timestamp=None):
+        '''Adds a spin result, does not block
+
+        :param seed: The seed of the spin, see WheelPhysics.reseed
+        :param task: The task the wheel stopped on, None for an empty segment
+        :param duration: The spin duration in seconds of physics time, fast forwarding does not shorten it
+        :param timestamp: The time the wheel stopped, defaults to now
+        '''
+        task_index = self.NO_TASK
+        new_task = None
+        if task is not None:
+            task_index = self.task_indices.get(task)
+            if task_index is None:
+                task_index = len(self.task_indices)
+                self.task_indices[task] = task_index
+                new_task = task
+        self._records.put((time.time() if timestamp is None else timestamp, seed or 0, task_index, duration, new_task))
+
+    def flush(self):
+        '''Blocks until the added records are written'''
+        if self._thread:
+            self._records.join()
+        else:
+            self._write(self._get_pending())
+
+    def get_records(self, since=None, until=None):
+        '''Returns the written spin results in a time range
+
+        :param since: The start timestamp, defaults to the first record
+        :param until: The end timestamp (exclusive), defaults to now
+        :return: List of (timestamp, seed, task, duration), the task is None for an empty segment
+        '''
+        tasks = {index: task for task, index in self.task_indices.items()}
+        return [(timestamp, seed, tasks.get(task_index), duration) for timestamp, seed, task_index, duration in self._read(since, until)]
+
+    def get_counts(self, since=None, until=None):
+        '''Returns how often the wheel stopped on each task in a time range
+
+        :param since: The start timestamp, defaults to the first record
+        :param until: The end timestamp (exclusive), defaults to now
+        :return: Dictionary of task -> count, None counts the empty segments
+        '''
+        counts = {}
+        for _, _, task_index, _ in self._read(since, until):
+            counts[task_index] = counts.get(task_index, 0) + 1
+        tasks = {index: task for task, index in self.task_indices.items()}
+        return {tasks.get(task_index): count for task_index, count in counts.items()}
+
+    def _read(self, since, until):
+        '''Reads the records in a time range, only from the hours it covers
+
+        :param since: The start timestamp or None
+        :param until: The end timestamp (exclusive) or None
+        :return: Generator of (timestamp, seed, task index, duration)
+        '''
+        with self._lock:
+            start = 0
+            if since is not None:
+                i = bisect.bisect_right(self.index_hours, int(since // self.HOUR)) - 1
+                start = self.index_offsets[i] if i >= 0 else 0
+            end = None
+            if until is not None:
+                i = bisect.bisect_right(self.index_hours, int(until // self.HOUR))
+                end = self.index_offsets[i] if i < len(self.index_offsets) else None
+
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read() if end is None else f.read(end - start)
+        # A record being written is left out
+        data = data[:len(data) - len(data) % self.RECORD.size]
+
+        for record in self.RECORD.iter_unpack(data):
+            if (since is None or record[0] >= since) and (until is None or record[0] < until):
+                yield record
+
+    def _get_pending(self):
+        '''Returns the added records that were not written yet, does not block
+
+        :return: List of records
+        '''
+        records = []
+        try:
+            while True:
+                records.append(self._records.get_nowait())
+        except queue.Empty:
+            pass
+        return records
+
+    def _run(self):
+        '''Collects the added records and writes them in batches'''
+        stopped = False
+        while not stopped:
+            records = [self._records.get()]
+            # Waits a bit for more, one write per interval at most
+            deadline = time.monotonic() + self.flush_interval
+            while records[-1] is not None and time.monotonic() < deadline:
+                try:
+                    records.append(self._records.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stopped = records[-1] is None
+            try:
+                self._write([r for r in records if r is not None])
+            except Exception as e:
+                logging.error('Error writing spin history "{}": {}'.format(self.path, e))
+            for _ in records:
+                self._records.task_done()
+
+    def _write(self, records):
+        '''Appends records to the log, the new tasks to the task table and new hours to the index
+
+        :param records: List of (timestamp, seed, task index, duration, new task or None)
+        '''
+        if not records:
+            return
+
+        new_tasks = [record[4] for record in records if record[4] is not None]
+        if new_tasks:
+            self._tasks_file.write(''.join('{}\n'.format(task.replace('\n', ' ')) for task in new_tasks))
+            self._tasks_file.flush()
+
+        data = []
+        offset = self._file.tell()
+        for timestamp, seed, task_index, duration, _ in records:
+            self._add_to_index(int(timestamp // self.HOUR), offset, write=True)
+            data.append(self.RECORD.pack(timestamp, seed & 0xFFFFFFFFFFFFFFFF, task_index, duration))
+            offset += self.RECORD.size
+        self._file.write(b''.join(data))
+        self._file.flush()
+        self._index_file.flush()
+        logging.debug('Wrote {} spin results'.format(len(records)))
+
+    def _add_to_index(self, hour, offset, write=False):
+        '''Adds the first record of a new hour to the index
+
+        :param hour: The hour of the record
+        :param offset: The offset of the record
+        :param write: Whether to append it to the index file
+        '''
+        # The clock may go back, the hours stay ordered
+        if self.index_hours and hour <= self.index_hours[-1]:
+            return
+        with self._lock:
+            self.index_hours.append(hour)
+            self.index_offsets.append(offset)
+        if write:
+            self._index_file.write(self.INDEX_ENTRY.pack(hour, offset))
+
+    def _load_tasks(self):
+        '''Loads the task table'''
+        if not os.path.exists(self.get_tasks_path()):
+            return
+
+        with open(self.get_tasks_path(), 'r', encoding='utf-8') as f:
+            for line in f:
+                self.task_indices.setdefault(line.rstrip('\n'), len(self.task_indices))
+
+    def _open(self):
+        '''Opens the log, drops a partially written record and catches up on the index'''
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if not self.read_only:
+            self._file = open(self.path, 'ab')
+            if size % self.RECORD.size:
+                logging.warning('Dropping a partially written spin result from "{}"'.format(self.path))
+                self._file.truncate(size - size % self.RECORD.size)
+                self._file.seek(0, os.SEEK_END)
+        size -= size % self.RECORD.size
+
+        if os.path.exists(self.get_index_path()):
+            with open(self.get_index_path(), 'rb') as f:
+                data = f.read()
+            for hour, offset in self.INDEX_ENTRY.iter_unpack(data[:len(data) - len(data) % self.INDEX_ENTRY.size]):
+                if offset < size:
+                    self._add_to_index(hour, offset)
+
+        # Records written after the last index entry, e.g. before a crash
+        start = self.index_offsets[-1] if self.index_offsets else 0
+        if size > start:
+            with open(self.path, 'rb') as f:
+                f.seek(start)
+                data = f.read(size - start)
+            for i, record in enumerate(self.RECORD.iter_unpack(data)):
+                self._add_to_index(int(record[0] // self.HOUR), start + i * self.RECORD.size)
+
+        logging.info('Spin history "{}" has {} spins'.format(self.path, size // self.RECORD.size))
+        if self.read_only:
+            return
+
+        # Rewritten, so that the file matches the index in memory
+        with open(self.get_index_path(), 'wb') as f:
+            for hour, offset in zip(self.index_hours, self.index_offsets):
+                f.write(self.INDEX_ENTRY.pack(hour, offset))
+        self._index_file = open(self.get_index_path(), 'ab')
+        self._tasks_file = open(self.get_tasks_path(), 'a', encoding='utf-8')
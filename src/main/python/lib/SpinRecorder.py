@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - SpinRecorder'''
+
+import json
+import logging
+import os
+import struct
+import zlib
+
+
+class SpinRecorder:
+    '''Records the input of a session to replay it
+
+    The file holds the session metadata as JSON, then one event per fixed step the mouse state changed in
+    and one per window resize, then a footer with the number of steps and a checksum of the wheel angles after every step.
+    '''
+
+    MAGIC = b'WFNREC01'
+    # Metadata length
+    HEADER = struct.Struct('<I')
+    # Step, mouse button, mouse x, mouse y, a resize has the button RESIZE and the window size instead of the mouse position
+    EVENT = struct.Struct('<IBhh')
+    RESIZE = 2
+    # Number of steps, angle trace checksum
+    FOOTER = struct.Struct('<QI')
+    FOOTER_STEP = 0xFFFFFFFF
+    ANGLE = struct.Struct('<d')
+
+    def __init__(self, path, metadata):
+        '''Initializes, starts recording
+
+        :param path: The recording path
+        :param metadata: Dictionary of JSON serializable session metadata
+        '''
+        logging.debug('Initializing SpinRecorder')
+
+        self.path = path
+        self.checksum = 0
+        self.mouse_state = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = json.dumps(metadata).encode('utf-8')
+        self._file = open(path, 'wb')
+        self._file.write(self.MAGIC)
+        self._file.write(self.HEADER.pack(len(data)))
+        self._file.write(data)
+
+        logging.info('Recording session to "{}"'.format(path))
+
+    @classmethod
+    def update_checksum(cls, checksum, angles):
+        '''Returns the checksum updated by the angles of one step
+
+        :param checksum: The checksum so far
+        :param angles: The wheel angles after the step
+        :return: The new checksum
+        '''
+        for angle in angles:
+            checksum = zlib.crc32(cls.ANGLE.pack(angle), checksum)
+        return checksum
+
+    @classmethod
+    def load(cls, path):
+        '''Loads a recording
+
+        :param path: The recording path
+        :return: Tuple of the metadata, the list of (step, (mouse button, mouse x, mouse y)) events,
+                 the number of steps, the checksum and the list of (step, window size) resizes,
+                 the number of steps and the checksum are None if the recording was not closed
+        '''
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError('Not a recording: "{}"'.format(path))
+
+        offset = len(cls.MAGIC)
+        length, = cls.HEADER.unpack_from(data, offset)
+        offset += cls.HEADER.size
+        metadata = json.loads(data[offset:offset + length].decode('utf-8'))
+        offset += length
+
+        events = []
+        resizes = []
+        nr_of_steps = None
+        checksum = None
+        while offset + cls.EVENT.size <= len(data):
+            step, button, x, y = cls.EVENT.unpack_from(data, offset)
+            offset += cls.EVENT.size
+            if step == cls.FOOTER_STEP:
+                nr_of_steps, checksum = cls.FOOTER.unpack_from(data, offset)
+                break
+            if button == cls.RESIZE:
+                resizes.append((step, (x, y)))
+            else:
+                events.append((step, (bool(button), x, y)))
+
+        return metadata, events, nr_of_steps, checksum, resizes
+
+    def record(self, step, mouse_state):
+        '''Records the mouse state of a step if it changed
+
+        :param step: The step
+        :param mouse_state: Tuple of the mouse button, mouse x and mouse y
+        '''
+        if mouse_state == self.mouse_state:
+            return
+        self.mouse_state = mouse_state
+        button, x, y = mouse_state
+        self._file.write(self.EVENT.pack(step, 1 if button else 0, x, y))
+
+    def record_resize(self, step, size):
+        '''Records a window resize, the wheels are laid out again before the step
+
+        :param step: The step
+        :param size: The window size
+        '''
+        self._file.write(self.EVENT.pack(step, self.RESIZE, size[0], size[1]))
+
+    def add_angles(self, angles):
+        '''Adds the wheel angles after a step to the checksum
+
+        :param angles: The wheel angles
+        '''
+        self.checksum = self.update_checksum(self.checksum, angles)
+
+    def close(self, nr_of_steps):
+        '''Finishes the recording
+
+        :param nr_of_steps: The number of recorded steps
+        '''
+        if self._file.closed:
+            return
+        self._file.write(self.EVENT.pack(self.FOOTER_STEP, 0, 0, 0))
+        self._file.write(self.FOOTER.pack(nr_of_steps, self.checksum))
+        self._file.close()
+        logging.info('Recorded {} steps to "{}", checksum {:08x}'.format(nr_of_steps, self.path, self.checksum))
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - SpinServer'''
+
+import asyncio
+import json
+import logging
+import math
+import random
+from urllib.parse import urlsplit
+
+from lib.AliasTable import AliasTable
+from lib.Tasks import Tasks
+from lib.TasksWatcher import TasksWatcher
+from lib.physics.WheelPhysics import WheelPhysics
+
+
+class SpinServer:
+    '''Headless HTTP server spinning the wheel for remote clients
+
+    Every spin is an independent session, they are served concurrently from one event loop, the spins are simulated on worker threads:
+
+    * GET /tasks returns the tasks on the wheel and their weights
+    * POST /spin with a JSON body {"speed": 12.5, "angle": 0, "seed": 42, "stream": false} spins the wheel,
+      the speed is limited to MAX_ANGLE_INCREASE of the physics.
+      The response is the result, or with "stream" newline-delimited JSON angle frames paced in real time, followed by the result.
+    '''
+
+    MAX_HEADER_SIZE = 16 * 1024
+    MAX_BODY_SIZE = 64 * 1024
+    MAX_STEPS = 100000
+
+    REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 408: 'Request Timeout',
+               413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+    def __init__(self, appconfig, tasks):
+        '''Initializes
+
+        :param appconfig: The app config
+        :param tasks: The tasks
+        '''
+        logging.debug('Initializing SpinServer')
+
+        self.appconfig = appconfig
+        self.tasks = tasks
+
+        self.server = None
+        self.tasks_watcher = None
+        self.nr_of_sessions = 0
+        self.nr_of_spins = 0
+
+        # The last task list and its segments, replaced as a whole, spins run on worker threads
+        self._segments = (None, None)
+
+    async def start(self):
+        '''Starts listening'''
+        if self.appconfig.watch_tasks and self.appconfig.tasks_backend != 'mmap':
+            self.tasks_watcher = TasksWatcher(self.appconfig, self.tasks)
+            self.tasks_watcher.start()
+
+        self.server = await asyncio.start_server(self._handle_connection, self.appconfig.server_host, self.appconfig.server_port,
+                                                 limit=self.MAX_HEADER_SIZE)
+        for socket in self.server.sockets:
+            logging.info('Listening on {}'.format(socket.getsockname()))
+
+    async def serve_forever(self):
+        '''Starts listening and serves until cancelled'''
+        await self.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        '''Stops listening and watching the tasks'''
+        if self.server:
+            self.server.close()
+        if self.tasks_watcher:
+            self.tasks_watcher.stop()
+            self.tasks_watcher = None
+
+    def spin(self, speed, angle=0, seed=None, tasks=None):
+        '''Spins the wheel until it comes to rest
+
+        :param speed: The initial speed in degrees per step, the sign is the direction
+        :param angle: The initial angle
+        :param seed: The seed for the random stopper braking
+        :param tasks: The tasks on the wheel, drawn by their weight in the fair draw mode, optional
+        :return: Tuple of the physics at rest and the angles after each step
+        '''
+        physics = WheelPhysics(seed=seed, angle=angle % 360, angle_increase=speed)
+        if tasks is not None and self.appconfig.draw_mode == 'fair':
+            bounds, alias_table = self._get_segments(tasks)
+            if alias_table:
+                physics.steer_to_segment(alias_table.draw(physics.rng), bounds, self.MAX_STEPS)
+        angles = []
+        while len(angles) < self.MAX_STEPS:
+            physics.step()
+            angles.append(physics.get_angle())
+            if physics.angle_increase == 0:
+                break
+        return physics, angles
+
+    def _get_tasks(self):
+        '''Returns the current tasks on the wheel
+
+        :return: List of tasks
+        '''
+        if self.tasks_watcher:
+            tasks = self.tasks_watcher.poll()
+            if tasks is not None:
+                self.tasks.tasks = tasks
+        return self.tasks.tasks
+
+    def _get_segments(self, tasks):
+        '''Returns the segments of the tasks, built once per task list
+
+        :param tasks: The tasks on the wheel
+        :return: Tuple of the end angles of the segments and the alias table for the fair draw, None if there are no tasks
+        '''
+        segments_tasks, segments = self._segments
+        if tasks is not segments_tasks:
+            weights = Tasks.get_weights(tasks, max(len(tasks), self.appconfig.min_segments))
+            alias_table = AliasTable(weights[:len(tasks)]) if sum(weights[:len(tasks)]) > 0 else None
+            segments = (WheelPhysics.get_segment_bounds(weights), alias_table)
+            self._segments = (tasks, segments)
+        return segments
+
+    def _get_result(self, physics, tasks, seed, nr_of_steps):
+        '''Returns the result of a spin
+
+        :param physics: The physics at rest
+        :param tasks: The tasks on the wheel
+        :param seed: The seed of the spin
+        :param nr_of_steps: The number of steps of the spin
+        :return: Dictionary of the result
+        '''
+        nr_of_segments = max(len(tasks), self.appconfig.min_segments)
+        segment = physics.get_segment(nr_of_segments, bounds=self._get_segments(tasks)[0])
+        return {
+            'angle': physics.get_angle(),
+            'segment': segment,
+            'task': Tasks.parse_entry(tasks[segment])[0] if segment < len(tasks) else None,
+            'seed': seed,
+            'steps': nr_of_steps,
+            'duration': nr_of_steps / self.appconfig.physics_rate
+        }
+
+    async def _handle_connection(self, reader, writer):
+        '''Serves one request per connection
+
+        :param reader: The stream reader
+        :param writer: The stream writer
+        '''
+        if self.nr_of_sessions >= self.appconfig.server_max_sessions:
+            await self._respond(writer, 503, {'error': 'Too many sessions'})
+            writer.close()
+            return
+
+        self.nr_of_sessions += 1
+        try:
+            method, path, body = await asyncio.wait_for(self._read_request(reader), self.appconfig.server_read_timeout)
+            await self._route(writer, method, path, body)
+        except asyncio.TimeoutError:
+            await self._respond(writer, 408, {'error': 'Timeout reading the request'})
+        except ValueError as e:
+            await self._respond(writer, 400, {'error': str(e)})
+        except (asyncio.LimitOverrunError, asyncio.IncompleteReadError):
+            await self._respond(writer, 413, {'error': 'Request too large or incomplete'})
+        except ConnectionError:
+            logging.debug('Client disconnected')
+        except Exception as e:
+            logging.error('Error serving request: {}'.format(e))
+        finally:
+            self.nr_of_sessions -= 1
+            writer.close()
+
+    async def _read_request(self, reader):
+        '''Reads an HTTP request
+
+        :param reader: The stream reader
+        :return: Tuple of the method, the path and the body
+        '''
+        header = await reader.readuntil(b'\r\n\r\n')
+        lines = header.decode('latin-1').split('\r\n')
+        parts = lines[0].split(' ')
+        if len(parts) != 3:
+            raise ValueError('Malformed request line')
+        method, target, _ = parts
+
+        content_length = 0
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                content_length = int(value.strip())
+        if content_length > self.MAX_BODY_SIZE:
+            raise asyncio.LimitOverrunError('Body too large', content_length)
+
+        body = await reader.readexactly(content_length) if content_length else b''
+        return method, urlsplit(target).path, body
+
+    async def _route(self, writer, method, path, body):
+        '''Handles a request
+
+        :param writer: The stream writer
+        :param method: The HTTP method
+        :param path: The request path
+        :param body: The request body
+        '''
+        if path == '/tasks':
+            if method != 'GET':
+                await self._respond(writer, 405, {'error': 'Use GET'})
+                return
+            entries = [Tasks.parse_entry(entry) for entry in self._get_tasks()]
+            await self._respond(writer, 200, {'tasks': [task for task, _ in entries], 'weights': [weight for _, weight in entries]})
+        elif path == '/spin':
+            if method != 'POST':
+                await self._respond(writer, 405, {'error': 'Use POST'})
+                return
+            await self._handle_spin(writer, json.loads(body or b'{}'))
+        else:
+            await self._respond(writer, 404, {'error': 'Unknown path'})
+
+    async def _handle_spin(self, writer, request):
+        '''Spins the wheel and sends the result or streams the frames
+
+        :param writer: The stream writer
+        :param request: Dictionary of the spin request
+        '''
+        if not isinstance(request, dict):
+            raise ValueError('Expected a JSON object')
+        try:
+            speed = float(request.get('speed', WheelPhysics.MAX_ANGLE_INCREASE))
+            angle = float(request.get('angle', 0))
+        except (TypeError, ValueError):
+            # Lists, objects and null raise a TypeError, answered like other bad values
+            raise ValueError('The speed and the angle have to be numbers')
+        if not math.isfinite(speed) or not math.isfinite(angle):
+            raise ValueError('The speed and the angle have to be finite')
+        speed = max(-WheelPhysics.MAX_ANGLE_INCREASE, min(speed, WheelPhysics.MAX_ANGLE_INCREASE))
+        seed = request.get('seed')
+        if seed is None:
+            seed = random.getrandbits(32)
+        if not isinstance(seed, int):
+            raise ValueError('The seed has to be an integer')
+
+        tasks = self._get_tasks()
+        loop = asyncio.get_running_loop()
+        # Simulated off the event loop, long spins would stall the other sessions
+        physics, angles = await loop.run_in_executor(None, self.spin, speed, angle, seed, tasks)
+        result = self._get_result(physics, tasks, seed, len(angles))
+        self.nr_of_spins += 1
+
+        if not request.get('stream'):
+            await self._respond(writer, 200, result)
+            return
+
+        writer.write(self._get_header(200, 'application/x-ndjson', chunked=True))
+        steps_per_frame = max(1, int(round(self.appconfig.physics_rate / self.appconfig.server_frame_rate)))
+        frame_time = steps_per_frame / self.appconfig.physics_rate
+        start = loop.time()
+        for i, frame_start in enumerate(range(0, len(angles), steps_per_frame)):
+            step = min(frame_start + steps_per_frame, len(angles))
+            await self._write_chunk(writer, {'step': step, 'angle': angles[step - 1]})
+            # Paced against the start, not the last frame, so that slow writes do not add up
+            await asyncio.sleep(max(0, start + (i + 1) * frame_time - loop.time()))
+        await self._write_chunk(writer, result)
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    def _get_header(self, status, content_type, content_length=None, chunked=False):
+        '''Returns an HTTP response header
+
+        :param status: The status code
+        :param content_type: The content type
+        :param content_length: The body length
+        :param chunked: Whether the body is sent in chunks
+        :return: The header bytes
+        '''
+        lines = ['HTTP/1.1 {} {}'.format(status, self.REASONS.get(status, '')),
+                 'Content-Type: {}'.format(content_type),
+                 'Connection: close']
+        if chunked:
+            lines.append('Transfer-Encoding: chunked')
+        elif content_length is not None:
+            lines.append('Content-Length: {}'.format(content_length))
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _respond(self, writer, status, data):
+        '''Sends a JSON response
+
+        :param writer: The stream writer
+        :param status: The status code
+        :param data: The JSON serializable data
+        '''
+        body = json.dumps(data).encode('utf-8')
+        writer.write(self._get_header(status, 'application/json', len(body)) + body)
+        await writer.drain()
+
+    async def _write_chunk(self, writer, data):
+        '''Sends one JSON line as chunk, waits while the client is slow
+
+        :param writer: The stream writer
+        :param data: The JSON serializable data
+        '''
+        line = json.dumps(data).encode('utf-8') + b'\n'
+        writer.write('{:x}\r\n'.format(len(line)).encode('latin-1') + line + b'\r\n')
+        await writer.drain()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - StartupTimer'''
+
+import logging
+import time
+
+
+class StartupTimer:
+    '''Measures the duration of the startup phases'''
+
+    def __init__(self):
+        '''Initializes and starts the timer'''
+        self.start = time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        '''Marks a startup phase as done
+
+        :param name: The name of the phase
+        '''
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        '''Logs the duration of every phase and the total duration'''
+        last = self.start
+        for name, end in self.marks:
+            logging.info('Startup: {:<16} {:8.1f} ms'.format(name, (end - last) * 1000))
+            last = end
+        logging.info('Startup: {:<16} {:8.1f} ms'.format('Total', (last - self.start) * 1000))
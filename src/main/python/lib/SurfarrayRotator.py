@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - SurfarrayRotator'''
+
+import logging
+import math
+
+import numpy as np
+import pygame
+
+
+class SurfarrayRotator:
+    '''Rotates a wheel face with NumPy instead of pygame.transform.rotozoom
+
+    The face is sampled once into a polar image, one row per half pixel of radius and one column per angular step of about a pixel at the rim.
+    Every pixel of the disc has a fixed ring and angle in it, so rotating only shifts the angle and gathers the packed pixels in one go.
+    Bilinear blends the two neighbouring angles, the rings are close enough to take the nearest one.
+    The corners outside the disc are never touched.
+    '''
+
+    QUALITIES = ('nearest', 'bilinear')
+    RINGS_PER_PIXEL = 2
+    # Fixed point fraction of the angle
+    FRACTION_BITS = 8
+    ONE = 1 << FRACTION_BITS
+    # Every other channel of a packed pixel, blended in one go
+    CHANNELS_MASK = np.uint32(0x00FF00FF)
+
+    # (Size, rings, angles) -> remap tables of the disc pixels, shared by all faces of the size
+    _tables = {}
+
+    def __init__(self, surface, quality='bilinear'):
+        '''Initializes
+
+        :param surface: The 32 bit wheel face, the disc fills it
+        :param quality: 'nearest' or 'bilinear'
+        '''
+        logging.debug('Initializing SurfarrayRotator')
+
+        if quality not in self.QUALITIES:
+            raise ValueError('Unknown rotation quality "{}"'.format(quality))
+
+        self.surface = surface
+        self.quality = quality
+        self.size = surface.get_size()
+
+        self.radius = min(self.size) / 2
+        self.nr_of_rings = int(math.ceil(self.radius * self.RINGS_PER_PIXEL)) + 1
+        self.nr_of_angles = max(360, int(math.ceil(2 * math.pi * self.radius)))
+        # The angles wrap around, the rows of the polar image hold them twice to save the modulo
+        self.row_length = 2 * self.nr_of_angles + 2
+        self.tables = self._get_tables(self.size, self.nr_of_rings, self.nr_of_angles, self.row_length)
+
+        self.polar = None
+        self.image = self.create_image()
+        xs, ys = self.tables['xs'], self.tables['ys']
+        self.targets = ys * (self.image.get_pitch() // 4) + xs
+
+    @classmethod
+    def _get_tables(cls, size, nr_of_rings, nr_of_angles, row_length):
+        '''Returns the remap tables of the disc pixels, computes them once per size
+
+        :param size: The face size
+        :param nr_of_rings: The number of rings of the polar image
+        :param nr_of_angles: The number of angular steps of the polar image
+        :param row_length: The length of a row of the polar image
+        :return: Dictionary of the tables, one entry per disc pixel in row order
+        '''
+        key = (tuple(size), nr_of_rings, nr_of_angles)
+        if key in cls._tables:
+            return cls._tables[key]
+
+        center_x, center_y = (size[0] - 1) / 2, (size[1] - 1) / 2
+        ys, xs = np.meshgrid(np.arange(size[1]), np.arange(size[0]), indexing='ij')
+        dx, dy = xs - center_x, ys - center_y
+        radius = np.hypot(dx, dy)
+        disc = radius < min(size) / 2
+        rings = np.minimum(np.round(radius[disc] * cls.RINGS_PER_PIXEL), nr_of_rings - 1)
+        angles = (np.arctan2(dy[disc], dx[disc]) / (2 * math.pi)) % 1 * nr_of_angles
+
+        tables = {
+            'xs': xs[disc].astype(np.intp),
+            'ys': ys[disc].astype(np.intp),
+            'rings': rings.astype(np.intp) * row_length,
+            'angles': np.minimum(np.round(angles * cls.ONE), nr_of_angles * cls.ONE - 1).astype(np.intp)
+        }
+        cls._tables[key] = tables
+        return tables
+
+    def create_image(self):
+        '''Returns a transparent surface to rotate into, the corners outside the disc stay transparent
+
+        :return: The surface
+        '''
+        image = self.surface.copy()
+        image.fill((0, 0, 0, 0))
+        return image
+
+    def invalidate(self):
+        '''Drops the polar image, the face was redrawn'''
+        self.polar = None
+
+    def _build_polar(self):
+        '''Samples the face into the polar image, bilinearly'''
+        logging.debug('Sampling wheel face into {}x{} polar image'.format(self.nr_of_angles, self.nr_of_rings))
+        width, height = self.size
+        row = self.surface.get_pitch() // 4
+        pixels = np.frombuffer(self.surface.get_view('0'), dtype=np.uint32).copy()
+
+        center_x, center_y = (width - 1) / 2, (height - 1) / 2
+        radius = (np.arange(self.nr_of_rings, dtype=np.float32) / self.RINGS_PER_PIXEL)[:, None]
+        angle = (np.arange(self.nr_of_angles, dtype=np.float32) * (2 * math.pi / self.nr_of_angles))[None, :]
+        x = np.clip(center_x + radius * np.cos(angle), 0, width - 1)
+        y = np.clip(center_y + radius * np.sin(angle), 0, height - 1)
+
+        x0 = np.minimum(x.astype(np.intp), width - 2)
+        y0 = np.minimum(y.astype(np.intp), height - 2)
+        fx = np.round((x - x0) * self.ONE).astype(np.uint32)
+        fy = np.round((y - y0) * self.ONE).astype(np.uint32)
+        indices = y0 * row + x0
+        top = self._blend(pixels.take(indices), pixels.take(indices + 1), fx)
+        bottom = self._blend(pixels.take(indices + row), pixels.take(indices + row + 1), fx)
+        polar = self._blend(top, bottom, fy)
+
+        self.polar = np.concatenate((polar, polar, polar[:, :2]), axis=1).ravel()
+
+    def _blend(self, a, b, weights):
+        '''Blends packed pixels channel by channel, two channels per operation, reuses a and b
+
+        :param a: The first pixels
+        :param b: The second pixels
+        :param weights: The weights of the second pixels, 0 to ONE
+        :return: The blended pixels
+        '''
+        mask = self.CHANNELS_MASK
+        inverse = self.ONE - weights
+        low = a & mask
+        low *= inverse
+        a >>= 8
+        a &= mask
+        a *= inverse
+        # Channels 1 and 3, their blend ends up where they came from
+        b_low = b & mask
+        b_low *= weights
+        low += b_low
+        low >>= self.FRACTION_BITS
+        low &= mask
+        b >>= 8
+        b &= mask
+        b *= weights
+        a += b
+        a &= ~mask
+        a |= low
+        return a
+
+    def rotate(self, angle, image=None):
+        '''Returns the face rotated counterclockwise by the angle, like rotozoom, but in the size of the face
+
+        The returned surface is reused by the next call into it, users sharing the rotator pass their own one.
+
+        :param angle: The angle in degrees
+        :param image: The surface to rotate into, see create_image, defaults to the rotator's own one
+        :return: The rotated surface
+        '''
+        image = image or self.image
+        if self.polar is None:
+            self._build_polar()
+
+        shift = int(round((angle % 360) / 360 * self.nr_of_angles * self.ONE)) % (self.nr_of_angles * self.ONE)
+        angles = self.tables['angles'] + shift
+        if self.quality == 'nearest':
+            pixels = self.polar.take(self.tables['rings'] + ((angles + self.ONE // 2) >> self.FRACTION_BITS))
+        else:
+            indices = self.tables['rings'] + (angles >> self.FRACTION_BITS)
+            pixels = self._blend(self.polar.take(indices), self.polar.take(indices + 1), (angles & (self.ONE - 1)).astype(np.uint32))
+
+        target = np.frombuffer(image.get_view('0'), dtype=np.uint32)
+        target[self.targets] = pixels
+        # Unlocks the surface for blitting
+        del target
+        return image
@@ -9,25 +9,59 @@
 '''Wheel of Fun - Tasks'''
 
 import logging
+import os
 import random
+import re
 
 
 class Tasks:
-    '''The tasks reader'''
+    '''The tasks reader
 
-    def __init__(self, appconfig):
+    A task may end with a weight, e.g. "Dishes ; weight=3", its segment is then three times as large.
+    '''
+
+    WEIGHT_PATTERN = re.compile(r'^(.*?)\s*;\s*weight\s*=\s*(\d+(?:\.\d*)?|\.\d+)\s*$', re.IGNORECASE)
+
+    def __init__(self, appconfig, seed=None):
         '''Initializes the tasks reader
 
         :param appconfig: The application config
+        :param seed: The seed for shuffling the tasks
         '''
         logging.debug('Initializing Tasks')
 
         self.appconfig = appconfig
+        self.rng = random.Random(seed)
 
         self.tasks = []
 
         self._init()
 
+    @classmethod
+    def parse_entry(cls, entry):
+        '''Splits a task entry into the task and its weight
+
+        :param entry: The task entry as in the file
+        :return: Tuple of the task and the weight, 1 if not given
+        '''
+        match = cls.WEIGHT_PATTERN.match(entry)
+        if not match:
+            return entry, 1.0
+        return match.group(1), float(match.group(2))
+
+    @classmethod
+    def get_weights(cls, entries, nr_of_segments=None):
+        '''Returns the weights of the task entries
+
+        :param entries: List of task entries
+        :param nr_of_segments: The number of segments, the segments without task weigh 1
+        :return: List of weights
+        '''
+        weights = [cls.parse_entry(entry)[1] for entry in entries]
+        if nr_of_segments:
+            weights.extend([1.0] * (nr_of_segments - len(weights)))
+        return weights
+
     def save_tasks(self, tasks):
         '''Sets new tasks
 
@@ -36,27 +70,133 @@ class Tasks:
         if not self.appconfig.tasksFilePath:
             return
 
-        with open(self.appconfig.tasksFilePath, 'w') as f:
+        # Written next to the file and moved over it, readers never see a partial file
+        path_tmp = '{}.tmp'.format(self.appconfig.tasksFilePath)
+        with open(path_tmp, 'w') as f:
             f.write('# One line per task\n')
             for t in tasks:
                 f.write(t)
                 f.write('\n')
+        os.replace(path_tmp, self.appconfig.tasksFilePath)
+        # The file contains all changes now
+        if os.path.exists(self.get_journal_path()):
+            os.remove(self.get_journal_path())
         self._init()
 
-    def _init(self):
-        '''Reads in the file and parses the tasks'''
-        self.tasks = []
+    def save_changes(self, changes):
+        '''Saves changed tasks by appending them to the journal, without rewriting the file
 
-        if not self.appconfig.tasksFilePath:
+        :param changes: Dictionary of task index in file order -> new task, an empty task deletes it, indices past the end add tasks
+        '''
+        if not self.appconfig.tasksFilePath or not changes:
+            return
+
+        with open(self.get_journal_path(), 'a') as f:
+            for index in sorted(changes):
+                f.write('{}\t{}\n'.format(index, changes[index].replace('\n', ' ')))
+        logging.info('Saved {} changed tasks'.format(len(changes)))
+        if self._is_journal_too_large():
+            self.compact()
+        else:
+            self._init()
+
+    def compact(self):
+        '''Applies the journal to the file'''
+        if not self.appconfig.tasksFilePath or not os.path.exists(self.get_journal_path()):
             return
 
+        logging.info('Applying the task changes to "{}"'.format(self.appconfig.tasksFilePath))
+        self.save_tasks(self.read(randomize=False))
+
+    def _is_journal_too_large(self):
+        '''Returns whether the journal outgrew the file, rewriting the file then costs little per change
+
+        :return: True if the journal should be applied to the file
+        '''
+        try:
+            journal_size = os.path.getsize(self.get_journal_path())
+            file_size = os.path.getsize(self.appconfig.tasksFilePath)
+        except OSError:
+            return False
+        return journal_size > file_size * self.appconfig.tasks_journal_max_ratio
+
+    def get_journal_path(self):
+        '''Returns the path of the journal of task changes
+
+        :return: The journal path
+        '''
+        return '{}.journal'.format(self.appconfig.tasksFilePath)
+
+    def read(self, randomize=None):
+        '''Reads in the file and parses the tasks, does not change the current tasks
+
+        :param randomize: Whether to shuffle the tasks, defaults to the configured behaviour
+        :return: List of tasks
+        '''
+        tasks = []
+
+        if not self.appconfig.tasksFilePath:
+            return tasks
+
         try:
-            with open(self.appconfig.tasksFilePath, 'r') as f:
-                for line in f:
-                    _line = line.strip()
-                    if _line and not _line.startswith('#'):
-                        self.tasks.append(_line)
-            if self.appconfig.randomize_tasks:
-                random.shuffle(self.tasks)
+            # Emptied tasks are deleted
+            tasks = [t for t in self.read_entries() if t and not t.startswith('#')]
+            if self.appconfig.randomize_tasks if randomize is None else randomize:
+                self.rng.shuffle(tasks)
         except Exception as e:
             logging.error('Error loading file "{}: {}"'.format(self.appconfig.tasksFilePath, e))
+
+        return tasks
+
+    def read_entries(self):
+        '''Reads in the file and applies the journal, deleted tasks stay as empty entries
+
+        The indices are those of the journal, so that changes to the entries can be appended to it.
+
+        :return: List of tasks in file order
+        '''
+        tasks = []
+        with open(self.appconfig.tasksFilePath, 'r') as f:
+            for line in f:
+                _line = line.strip()
+                if _line and not _line.startswith('#'):
+                    tasks.append(_line)
+        return self._apply_journal(tasks)
+
+    def _apply_journal(self, tasks):
+        '''Applies the journal of task changes
+
+        :param tasks: List of tasks in file order
+        :return: List of changed tasks, deleted ones are empty
+        '''
+        changes = self.read_journal(self.get_journal_path())
+        for index in sorted(changes):
+            if index >= len(tasks):
+                tasks.extend([''] * (index + 1 - len(tasks)))
+            tasks[index] = changes[index]
+
+        return tasks
+
+    @staticmethod
+    def read_journal(path):
+        '''Reads a journal of task changes, later changes of a task replace earlier ones
+
+        :param path: The journal path
+        :return: Dictionary of task index in file order -> changed task, deleted tasks are empty
+        '''
+        changes = {}
+        if not os.path.exists(path):
+            return changes
+
+        with open(path, 'r') as f:
+            for line in f:
+                index, _, task = line.rstrip('\n').partition('\t')
+                if not index.isdigit():
+                    continue
+                changes[int(index)] = task.strip()
+
+        return changes
+
+    def _init(self):
+        '''Reads in the file and parses the tasks'''
+        self.tasks = self.read()
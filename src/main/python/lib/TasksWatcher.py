@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - TasksWatcher'''
+
+import logging
+import os
+import queue
+import threading
+
+
+class TasksWatcher:
+    '''Watches the tasks file and reads changed tasks in the background'''
+
+    def __init__(self, appconfig, tasks):
+        '''Initializes the tasks watcher
+
+        :param appconfig: The application config
+        :param tasks: The tasks
+        '''
+        logging.debug('Initializing TasksWatcher')
+
+        self.appconfig = appconfig
+        self.tasks = tasks
+
+        self._changed_tasks = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_stat = self._stat()
+
+    def start(self):
+        '''Starts watching'''
+        if self._thread or not self.appconfig.tasksFilePath:
+            return
+
+        logging.debug('Watching "{}"'.format(self.appconfig.tasksFilePath))
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='TasksWatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        '''Stops watching'''
+        if not self._thread:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def poll(self):
+        '''Returns the latest changed tasks, does not block
+
+        :return: List of tasks or None if the tasks did not change
+        '''
+        tasks = None
+        try:
+            while True:
+                tasks = self._changed_tasks.get_nowait()
+        except queue.Empty:
+            pass
+        return tasks
+
+    def _stat(self):
+        '''Returns the modification times and sizes of the tasks file and its journal
+
+        :return: Tuple of the modification time and size per file, None if the file does not exist
+        '''
+        return self._stat_file(self.appconfig.tasksFilePath), self._stat_file(self.tasks.get_journal_path())
+
+    def _stat_file(self, path):
+        '''Returns the modification time and size of a file
+
+        :param path: The file path
+        :return: Tuple of modification time and size or None if the file does not exist
+        '''
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except (OSError, TypeError):
+            return None
+
+    def _run(self):
+        '''Checks the tasks file until stopped'''
+        while not self._stop.wait(self.appconfig.tasks_watch_interval):
+            stat = self._stat()
+            if stat == self._last_stat:
+                continue
+
+            self._last_stat = stat
+            logging.info('Tasks file changed, reloading')
+            self._changed_tasks.put(self.tasks.read())
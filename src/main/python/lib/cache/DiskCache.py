@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - DiskCache'''
+
+import logging
+import os
+
+from lib.cache.Cache import Cache
+
+
+class DiskCache(Cache):
+    '''Content-addressed cache of raw data on disk
+
+    Keeps at most max_bytes of entries, the least recently used ones are deleted first.
+    Every window size adds a scaled background, without a limit the cache would grow forever.
+    '''
+
+    TMP_SUFFIX = '.tmp'
+
+    def __init__(self, path, max_bytes=128 * 1024 * 1024):
+        '''Initializes
+
+        :param path: The cache directory
+        :param max_bytes: The size budget of all entries in bytes
+        '''
+        super()
+
+        logging.debug('Initializing DiskCache')
+
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def _get_path(self, key):
+        '''Returns the file path for the key
+
+        :param key: The key
+        :return: The file path
+        '''
+        return os.path.join(self.path, key)
+
+    def load(self, key):
+        '''Returns the data for the key
+
+        :param key: The key
+        :return: The data or None if not cached
+        '''
+        try:
+            with open(self._get_path(key), 'rb') as f:
+                data = f.read()
+            # The modification time orders the entries for the eviction
+            os.utime(self._get_path(key))
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error('Error loading cache entry "{}": {}'.format(key, e))
+            return None
+
+    def save(self, key, data):
+        '''Saves the data for the key, evicts the least recently used entries beyond the size budget
+
+        :param key: The key
+        :param data: The data
+        '''
+        if len(data) > self.max_bytes:
+            logging.debug('Not caching entry "{}", {} bytes exceed the budget'.format(key, len(data)))
+            return
+
+        try:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+            # Write to a temporary file first so a crash never leaves a truncated entry
+            path_tmp = '{}.{}{}'.format(self._get_path(key), os.getpid(), self.TMP_SUFFIX)
+            with open(path_tmp, 'wb') as f:
+                f.write(data)
+            os.replace(path_tmp, self._get_path(key))
+            self._evict()
+        except Exception as e:
+            logging.error('Error saving cache entry "{}": {}'.format(key, e))
+
+    def _evict(self):
+        '''Deletes the least recently used entries until the entries fit into the size budget'''
+        entries = []
+        nr_of_bytes = 0
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.endswith(self.TMP_SUFFIX):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                nr_of_bytes += stat.st_size
+        if nr_of_bytes <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if nr_of_bytes <= self.max_bytes:
+                break
+            logging.debug('Evicting cache entry "{}"'.format(os.path.basename(path)))
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Evicted by another instance
+                pass
+            nr_of_bytes -= size
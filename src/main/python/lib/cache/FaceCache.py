@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - FaceCache'''
+
+import logging
+from collections import OrderedDict
+
+from lib.cache.Cache import Cache
+
+
+class FaceCache(Cache):
+    '''Shares pre-rendered wheel faces between wheels with identical task sets and sizes
+
+    Faces are reference counted, unused faces are kept for reuse up to a limit.
+    '''
+
+    def __init__(self, max_unused=4):
+        '''Initializes
+
+        :param max_unused: The maximum number of kept faces no wheel uses
+        '''
+        super()
+
+        logging.debug('Initializing FaceCache')
+
+        self.max_unused = max_unused
+
+        # Key -> [face, number of users]
+        self.faces = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self.faces
+
+    def acquire(self, key, build):
+        '''Returns the face for the key, builds it on a miss
+
+        :param key: The face key
+        :param build: Function returning a new face
+        :return: The face
+        '''
+        entry = self.faces.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = [build(), 0]
+            self.faces[key] = entry
+        else:
+            self.hits += 1
+            self.faces.move_to_end(key)
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, key):
+        '''Releases a face acquired before
+
+        :param key: The face key
+        '''
+        entry = self.faces.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        self._evict()
+
+    def get_users(self, key):
+        '''Returns how many wheels use the face
+
+        :param key: The face key
+        :return: The number of users
+        '''
+        entry = self.faces.get(key)
+        return entry[1] if entry else 0
+
+    def replace(self, key, new_key, face):
+        '''Moves a face changed in place to a new key, keeps its users
+
+        :param key: The old face key
+        :param new_key: The new face key
+        :param face: The changed face
+        '''
+        entry = self.faces.pop(key, None)
+        users = entry[1] if entry else 1
+        self.faces[new_key] = [face, users]
+
+    def clear(self):
+        '''Drops all faces'''
+        self.faces.clear()
+
+    def _evict(self):
+        '''Drops the least recently used unused faces above the limit'''
+        unused = [key for key, entry in self.faces.items() if entry[1] <= 0]
+        for key in unused[:max(0, len(unused) - self.max_unused)]:
+            logging.debug('Dropping unused wheel face')
+            del self.faces[key]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - FontCache'''
+
+import logging
+from collections import OrderedDict
+
+import pygame
+
+from lib.cache.Cache import Cache
+
+
+class FontCache(Cache):
+    '''Process-wide cache of fonts and rendered, rotated texts'''
+
+    fonts = {}
+    renders = OrderedDict()
+    max_renders = 4096
+
+    @classmethod
+    def get_font(cls, name, size, bold=False, italic=False):
+        '''Returns the font, looks up the system fonts only once per font
+
+        :param name: The font name
+        :param size: The font size
+        :param bold: Whether the font is bold
+        :param italic: Whether the font is italic
+        :return: The font
+        '''
+        key = (name, size, bold, italic)
+        font = cls.fonts.get(key)
+        if font is None:
+            logging.debug('Loading font {}'.format(key))
+            font = pygame.font.SysFont(name, size, bold=bold, italic=italic)
+            cls.fonts[key] = font
+        return font
+
+    @classmethod
+    def render(cls, text, name, size, color, angle=0, bold=False, italic=False):
+        '''Returns the rendered text rotated by the given angle
+
+        :param text: The text
+        :param name: The font name
+        :param size: The font size
+        :param color: The text color
+        :param angle: The rotation angle
+        :param bold: Whether the font is bold
+        :param italic: Whether the font is italic
+        :return: The rendered surface
+        '''
+        key = (text, name, size, bold, italic, tuple(color), angle)
+        image = cls.renders.get(key)
+        if image is not None:
+            cls.renders.move_to_end(key)
+            return image
+
+        image = cls.get_font(name, size, bold, italic).render(text, True, color)
+        if angle:
+            image = pygame.transform.rotozoom(image, angle, 1)
+
+        cls.renders[key] = image
+        while len(cls.renders) > cls.max_renders:
+            cls.renders.popitem(last=False)
+
+        return image
+
+    @classmethod
+    def clear(cls):
+        '''Drops all fonts and rendered texts'''
+        cls.fonts.clear()
+        cls.renders.clear()
@@ -8,15 +8,23 @@
 
 '''Wheel of Fun - ImageCache'''
 
+import hashlib
 import logging
+import struct
+from collections import OrderedDict
 
 import pygame
 
 from lib.cache.Cache import Cache
+from lib.cache.DiskCache import DiskCache
 
 
 class ImageCache(Cache):
 
+    VERSION = 1
+    # Width, height
+    HEADER = struct.Struct('<II')
+
     def __init__(self, appconfig):
         '''Initializes
 
@@ -28,19 +36,61 @@ class ImageCache(Cache):
 
         self.appconfig = appconfig
 
+        self.diskcache = None
+        if self.appconfig.image_disk_cache_enabled:
+            self.diskcache = DiskCache(self.appconfig.cache_dir_path, self.appconfig.image_disk_cache_max_bytes)
+
         self.app_logo = None
-        self.wheel_logo = None
-        self.background = None
+        # (Path, size, alpha) -> display-ready image, least recently used first
+        self.images = OrderedDict()
 
         self._load()
 
+    def get_image(self, path, size=None, alpha=False):
+        '''Returns the display-ready image, scaled to the given size
+
+        Decoded and scaled pixels are kept on disk, keyed by the file content, size and pixel format.
+
+        :param path: The image path
+        :param size: The size or None to keep the original size
+        :param alpha: Whether the image has per-pixel alpha
+        :return: The image
+        '''
+        memory_key = (path, tuple(size) if size else None, alpha)
+        if memory_key in self.images:
+            self.images.move_to_end(memory_key)
+            return self.images[memory_key]
+
+        pixel_format = 'RGBA' if alpha else 'RGB'
+
+        key = None
+        image = None
+        if self.diskcache:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            key = '{}-{}-{}-{}.raw'.format(digest, '{}x{}'.format(*size) if size else 'orig', pixel_format, self.VERSION)
+            data = self.diskcache.load(key)
+            if data:
+                width, height = self.HEADER.unpack_from(data)
+                image = pygame.image.frombuffer(memoryview(data)[self.HEADER.size:], (width, height), pixel_format)
+
+        if not image:
+            logging.debug('Decoding image "{}"'.format(path))
+            image = pygame.image.load(path)
+            if size:
+                image = pygame.transform.scale(image, size)
+            if key:
+                data = self.HEADER.pack(image.get_width(), image.get_height()) + pygame.image.tostring(image, pixel_format)
+                self.diskcache.save(key, data)
+
+        image = image.convert_alpha() if alpha else image.convert()
+        self.images[memory_key] = image
+        while len(self.images) > self.appconfig.image_cache_max_entries:
+            self.images.popitem(last=False)
+        return image
+
     def _load(self):
         '''Loads the images'''
         logging.debug('Loading images')
 
-        self.app_logo = pygame.image.load(
-            self.appconfig.path_img_app_logo).convert()
-        self.wheel_logo = pygame.image.load(
-            self.appconfig.path_img_wheel_logo).convert_alpha()
-        self.background = pygame.image.load(
-            self.appconfig.path_img_background).convert()
+        self.app_logo = self.get_image(self.appconfig.path_img_app_logo)
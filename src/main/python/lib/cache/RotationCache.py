@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - RotationCache'''
+
+import logging
+from collections import OrderedDict
+
+import pygame
+
+from lib.cache.Cache import Cache
+
+
+class RotationCache(Cache):
+    '''Caches rotated versions of a surface at a fixed angular resolution
+
+    A spinning wheel asks for the angles in order, round and round, and a revolution rarely fits into the budget.
+    Evicting the least recently used rotation would drop each one just before it comes round again, so once the budget is full,
+    the cached rotations stay and only the latest one is replaced. That one still serves a slow wheel asking for it repeatedly.
+    '''
+
+    def __init__(self, resolution=0.5, max_bytes=128 * 1024 * 1024, rotator=None):
+        '''Initializes
+
+        :param resolution: The angular resolution in degrees
+        :param max_bytes: The memory budget in bytes
+        :param rotator: The SurfarrayRotator of the surface, optional, rotozoom is used without
+        '''
+        super()
+
+        logging.debug('Initializing RotationCache')
+
+        self.resolution = resolution
+        self.max_bytes = max_bytes
+        self.rotator = rotator
+        self.nr_of_steps = int(round(360 / self.resolution))
+
+        self.surface = None
+        self.images = OrderedDict()
+        self.nr_of_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def set_surface(self, surface):
+        '''Sets the surface to be rotated and drops all cached rotations
+
+        :param surface: The surface
+        '''
+        self.surface = surface
+        self.invalidate()
+
+    def invalidate(self):
+        '''Drops all cached rotations'''
+        if self.images:
+            logging.debug('Invalidating {} cached rotations'.format(len(self.images)))
+        self.images.clear()
+        self.nr_of_bytes = 0
+
+    def get(self, angle):
+        '''Returns the surface rotated by the given angle, quantized to the resolution
+
+        :param angle: The angle in degrees
+        :return: The rotated surface
+        '''
+        step = int(round((angle % 360) / self.resolution)) % self.nr_of_steps
+
+        image = self.images.get(step)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        if self.rotator:
+            # The rotator reuses its image
+            image = self.rotator.rotate(step * self.resolution).copy()
+        else:
+            image = pygame.transform.rotozoom(self.surface, step * self.resolution, 1)
+        nr_of_bytes = image.get_width() * image.get_height() * image.get_bytesize()
+        if nr_of_bytes > self.max_bytes:
+            return image
+
+        while self.images and self.nr_of_bytes + nr_of_bytes > self.max_bytes:
+            # The latest rotation, in insertion order
+            _, evicted = self.images.popitem(last=True)
+            self.nr_of_bytes -= evicted.get_width() * evicted.get_height() * evicted.get_bytesize()
+
+        self.images[step] = image
+        self.nr_of_bytes += nr_of_bytes
+
+        return image
@@ -30,21 +30,74 @@ class SoundCache(Cache):
 
         self.sound_stopper = None
         self.sound_tada = None
-        self.num_channels = 30
+        self.num_channels = self.appconfig.mixer_num_channels
         pygame.mixer.set_num_channels(self.num_channels)  # default is 8
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.num_channels)]
 
-        self.curr_channel = 0
+        # Sound -> (priority, minimum milliseconds between two plays)
+        self.voices = {}
+        # Sound -> ticks when last played
+        self.last_played = {}
+        # Channel index -> (priority, ticks when started)
+        self.channel_voices = {}
 
         self._load()
 
+    @staticmethod
+    def pre_init(appconfig):
+        '''Sets the mixer parameters, has to be called before the mixer is initialized
+
+        :param appconfig: The app config
+        '''
+        pygame.mixer.pre_init(frequency=appconfig.mixer_frequency, buffer=appconfig.mixer_buffer)
+
+    def register(self, sound, priority=0, max_rate=0):
+        '''Registers how a sound is played
+
+        :param sound: The sound
+        :param priority: The priority, a sound may take over channels of sounds with the same or a lower priority
+        :param max_rate: The maximum number of plays per second, 0 for unlimited
+        '''
+        self.voices[sound] = (priority, 1000 / max_rate if max_rate else 0)
+
     def play(self, sound):
         '''Plays the sound
 
         :param sound: Sound to play
+        :return: True if the sound is played, False if it was dropped
         '''
-        pygame.mixer.Channel(self.curr_channel).play(sound)
-        self.curr_channel += 1
-        self.curr_channel = self.curr_channel % self.num_channels
+        priority, min_interval = self.voices.get(sound, (0, 0))
+        now = pygame.time.get_ticks()
+
+        last_played = self.last_played.get(sound)
+        if last_played is not None and now - last_played < min_interval:
+            return False
+
+        channel = self._find_channel(priority)
+        if channel is None:
+            logging.debug('Dropping sound, no free channel')
+            return False
+
+        self.channels[channel].play(sound)
+        self.channel_voices[channel] = (priority, now)
+        self.last_played[sound] = now
+        return True
+
+    def _find_channel(self, priority):
+        '''Returns a free channel or the channel to steal, the oldest with the lowest priority
+
+        :param priority: The priority of the sound to play
+        :return: The channel index or None if all channels play sounds of a higher priority
+        '''
+        stealable = None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return i
+            voice = self.channel_voices.get(i, (0, 0))
+            if voice[0] <= priority and (stealable is None or voice < stealable[0]):
+                stealable = (voice, i)
+
+        return stealable[1] if stealable else None
 
     def _load(self):
         '''Loads the sounds'''
@@ -52,3 +105,6 @@ class SoundCache(Cache):
 
         self.sound_stopper = pygame.mixer.Sound(self.appconfig.path_sound_stopper)
         self.sound_tada = pygame.mixer.Sound(self.appconfig.path_sound_tada)
+
+        self.register(self.sound_stopper, self.appconfig.sound_stopper_priority, self.appconfig.sound_stopper_max_rate)
+        self.register(self.sound_tada, self.appconfig.sound_tada_priority, self.appconfig.sound_tada_max_rate)
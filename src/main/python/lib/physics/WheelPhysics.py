@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - WheelPhysics'''
+
+import bisect
+import copy
+import logging
+import random
+
+from gui.enums.SpinningDirection import SpinningDirection
+
+
+class WheelPhysics:
+    '''The wheel spin physics, independent of rendering and input polling
+
+    All speeds are in degrees per step.
+    '''
+
+    INCREASE_ON_DRAG = 0.1
+    DECREASE_ON_DRAG_STOP = 0.02
+    DECREASE_ON_STOPPER_MIN = 0.01
+    DECREASE_ON_STOPPER_MAX = 0.04
+    THRESHOLD_NOT_SPINNING = 0.01
+    MAX_ANGLE_INCREASE = 20
+
+    # (Maximum absolute angle increase, angle decrease factor) for "smoothing out", factor is 1 above
+    ANGLE_DECREASE_FACTORS = [(0.4, 0.08), (0.5, 0.09), (0.6, 0.1), (0.7, 0.11), (0.8, 0.125), (0.9, 0.15), (1, 0.22),
+                              (1.1, 0.31), (1.2, 0.4), (1.3, 0.5), (1.4, 0.6), (2, 0.7), (3, 0.8), (4, 0.9), (5, 0.95)]
+
+    STOPPER_ANGLE = 45
+    # The stopper points to the top of the wheel
+    POINTER_ANGLE = 270
+
+    def __init__(self, center=(0, 0), seed=None, angle=0, angle_increase=0):
+        '''Initializes
+
+        :param center: The wheel center in mouse coordinates
+        :param seed: The seed for the random stopper braking
+        :param angle: The initial angle
+        :param angle_increase: The initial angle increase (velocity)
+        '''
+        logging.debug('Initializing WheelPhysics')
+
+        self.center = center
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        self.angle = angle
+        self.angle_mod_45 = angle % self.STOPPER_ANGLE
+        self.angle_increase = angle_increase
+        # Degrees turned in total
+        self.travel = 0
+        # Added to the angle when steering, does not take part in the braking
+        self.angle_offset = 0
+        self._offset_remaining = 0
+        self._offset_per_travel = 0
+        self.spinning_direction_last = []
+        self.spinning_direction = SpinningDirection.NONE
+
+        self.last_mouse_x = self.center[0]
+        self.last_mouse_y = self.center[0]
+
+    def _update_spinning_direction(self):
+        '''Updates the spinning direction'''
+        self.spinning_direction_last.append(self.spinning_direction)
+        if len(self.spinning_direction_last) > 20:
+            self.spinning_direction_last = self.spinning_direction_last[20:]
+        if self.angle_increase >= -self.INCREASE_ON_DRAG and self.angle_increase <= self.INCREASE_ON_DRAG:
+            self.spinning_direction = SpinningDirection.NONE
+        elif self.angle_increase > 0:
+            self.spinning_direction = SpinningDirection.RIGHT
+        else:
+            self.spinning_direction = SpinningDirection.LEFT
+
+    def _update_angle_increase_on_mouse_pressed(self, mouse_x, mouse_y):
+        '''Updates the angle increase on mouse pressed, only a moving mouse drags'''
+        if mouse_y == self.last_mouse_y:
+            return
+        in_left_half = mouse_x <= self.center[0]
+        if self.last_mouse_y < mouse_y:
+            self.angle_increase += -self.INCREASE_ON_DRAG if in_left_half else self.INCREASE_ON_DRAG
+        else:
+            self.angle_increase += self.INCREASE_ON_DRAG if in_left_half else -self.INCREASE_ON_DRAG
+
+    def _get_angle_decrease_factor(self):
+        '''Returns the angle decrease factor for "smoothing out"
+
+        :return: Angle decrease factor
+        '''
+        if not self.is_spinning():
+            return 1.0
+
+        # The spinning direction matches the sign of the angle increase, so both directions share the table
+        magnitude = abs(self.angle_increase)
+        for max_angle_increase, value in self.ANGLE_DECREASE_FACTORS:
+            if magnitude <= max_angle_increase:
+                return value
+
+        return 1
+
+    def _get_angle_increase(self):
+        '''Returns the angle increase value, multiplies a factor for "smoothing out"
+
+        :return: Angle increase value
+        '''
+        value = self.DECREASE_ON_DRAG_STOP * self._get_angle_decrease_factor()
+
+        return -1 * value if self.is_spinning_right() else value
+
+    def _update_angle_increase_on_mouse_not_pressed(self):
+        '''Updates the angle increase on mouse not pressed'''
+        self.angle_increase += self._get_angle_increase()
+
+        # Decrease speed every stopper (~= every 45 degrees) a bit more
+        if self.is_45_deg():
+            factor = 1 if self.is_spinning_right() else -1
+            self.angle_increase -= factor * \
+                self.rng.uniform(self.DECREASE_ON_STOPPER_MIN, self.DECREASE_ON_STOPPER_MAX)
+
+        # TODO: Spin back on stopper bump
+
+        if self.spinning_direction == SpinningDirection.NONE:
+            self.angle_increase = 0
+        elif self.spinning_direction == SpinningDirection.RIGHT and self.angle_increase <= self.THRESHOLD_NOT_SPINNING:
+            self.angle_increase = 0
+        elif self.spinning_direction == SpinningDirection.LEFT and self.angle_increase >= -self.THRESHOLD_NOT_SPINNING:
+            self.angle_increase = 0
+
+    def _update_angle_increase(self, mouse_pressed, mouse_x, mouse_y):
+        '''Updates the angle increase
+
+        :param mouse_pressed: Whether the mouse is pressed
+        :param mouse_x: The mouse x coordinate
+        :param mouse_y: The mouse y coordinate
+        '''
+        self._update_spinning_direction()
+
+        if mouse_pressed:
+            self._update_angle_increase_on_mouse_pressed(mouse_x, mouse_y)
+        else:
+            self._update_angle_increase_on_mouse_not_pressed()
+
+        if self.angle_increase > self.MAX_ANGLE_INCREASE:
+            self.angle_increase = self.MAX_ANGLE_INCREASE
+        if self.angle_increase < -1 * self.MAX_ANGLE_INCREASE:
+            self.angle_increase = -1 * self.MAX_ANGLE_INCREASE
+
+        self.last_mouse_x, self.last_mouse_y = mouse_x, mouse_y
+
+    def _update_angle(self):
+        '''Updates the angle'''
+        self.angle_mod_45 = self.angle % self.STOPPER_ANGLE
+        self.angle -= self.angle_increase
+        self.angle = self.angle % 360
+        self.travel += abs(self.angle_increase)
+
+        if self._offset_remaining:
+            # Steered in proportion to the speed, the rest once the wheel stopped
+            offset = self._offset_per_travel * abs(self.angle_increase)
+            if self.angle_increase == 0 or abs(offset) >= abs(self._offset_remaining):
+                offset = self._offset_remaining
+            self.angle_offset = (self.angle_offset + offset) % 360
+            self._offset_remaining -= offset
+
+    def is_45_deg(self):
+        '''Returns whether wheel is on 45 degrees
+
+        :return: True if wheel is on 45 degrees, False else
+        '''
+        factor = 1 if self.is_spinning_right() else -1
+        incdec = 3 + factor * self.angle_increase
+        d1 = False
+        d2 = False
+        if self.is_spinning_right():
+            d1 = self.angle_mod_45 > incdec
+            d2 = self.angle_mod_45 - self.angle_increase < incdec
+        elif self.is_spinning_left():
+            d1 = self.angle_mod_45 < (45 - incdec)
+            d2 = self.angle_mod_45 + factor * \
+                self.angle_increase > (45 - incdec)
+        return d1 and d2
+
+    def step(self, mouse_pressed=False, mouse_x=None, mouse_y=None):
+        '''Advances the physics by one step
+
+        :param mouse_pressed: Whether the mouse is pressed
+        :param mouse_x: The mouse x coordinate, defaults to the last one
+        :param mouse_y: The mouse y coordinate, defaults to the last one
+        :return: True if the wheel passed a stopper, False else
+        '''
+        mouse_x = self.last_mouse_x if mouse_x is None else mouse_x
+        mouse_y = self.last_mouse_y if mouse_y is None else mouse_y
+
+        self._update_angle_increase(mouse_pressed, mouse_x, mouse_y)
+        self._update_angle()
+
+        return self.is_45_deg()
+
+    def run_to_rest(self, max_steps=1000000):
+        '''Advances the physics without input until the wheel comes to rest
+
+        :param max_steps: The maximum number of steps
+        :return: The number of steps taken
+        '''
+        steps = 0
+        while steps < max_steps:
+            self.step()
+            steps += 1
+            if self.angle_increase == 0:
+                break
+
+        return steps
+
+    def copy(self):
+        '''Returns an independent copy, including the state of the random generator
+
+        :return: The copy
+        '''
+        physics = copy.copy(self)
+        physics.rng = random.Random()
+        physics.rng.setstate(self.rng.getstate())
+        physics.spinning_direction_last = list(self.spinning_direction_last)
+        return physics
+
+    def predict(self, max_steps=1000000):
+        '''Predicts where the wheel comes to rest if it gets no more input, does not change the state
+
+        Replays the remaining spin on a copy, which is exact as the braking is drawn from the same random state.
+
+        :param max_steps: The maximum number of steps
+        :return: Tuple of the resting angle and the number of steps until then
+        '''
+        physics = self.copy()
+        steps = physics.run_to_rest(max_steps)
+        return physics.get_angle(), steps
+
+    def steer_to(self, target_angle, max_steps=1000000):
+        '''Lets the wheel come to rest at the target angle instead of where the braking would stop it
+
+        The missing angle is spread over the rest of the spin in proportion to the speed, so the wheel
+        just turns a bit further. The braking is not changed, it stays the same random draws.
+
+        :param target_angle: The resting angle
+        :param max_steps: The maximum number of steps
+        :return: True if steered, False if the wheel is not spinning
+        '''
+        self._offset_remaining = 0
+        physics = self.copy()
+        physics.run_to_rest(max_steps)
+        travel = physics.travel - self.travel
+        if travel <= 0:
+            return False
+
+        # The angle decreases while spinning right, always steered forwards
+        direction = -1 if self.angle_increase > 0 else 1
+        self._offset_remaining = direction * ((target_angle - physics.get_angle()) * direction % 360)
+        self._offset_per_travel = self._offset_remaining / travel
+        return True
+
+    def steer_to_segment(self, segment, bounds, max_steps=1000000):
+        '''Lets the wheel come to rest somewhere in the segment, not on its edges
+
+        :param segment: The segment index
+        :param bounds: The end angles of the segments
+        :param max_steps: The maximum number of steps
+        :return: True if steered, False if the wheel is not spinning
+        '''
+        return self.steer_to(self.get_segment_angle(segment, bounds, 0.1 + 0.8 * self.rng.random()), max_steps)
+
+    def get_angle(self):
+        '''Returns the angle the wheel is shown at, including the steering
+
+        :return: The angle
+        '''
+        return (self.angle + self.angle_offset) % 360
+
+    @staticmethod
+    def get_segment_bounds(weights):
+        '''Returns where the segments end, the segment sizes are in proportion to the weights
+
+        :param weights: The segment weights
+        :return: List of the end angles of the segments
+        '''
+        total = float(sum(weights))
+        if total <= 0:
+            weights = [1] * len(weights)
+            total = float(len(weights))
+        bounds = []
+        end = 0
+        for weight in weights:
+            end += weight
+            bounds.append(end * 360 / total)
+        if bounds:
+            bounds[-1] = 360.0
+        return bounds
+
+    @classmethod
+    def get_segment_angle(cls, segment, bounds, position=0.5):
+        '''Returns the wheel angle which puts the segment under the stopper
+
+        :param segment: The segment index
+        :param bounds: The end angles of the segments
+        :param position: Where in the segment, from 0 (start) to 1 (end)
+        :return: The wheel angle
+        '''
+        start = bounds[segment - 1] if segment else 0
+        return (start + (bounds[segment] - start) * position - cls.POINTER_ANGLE) % 360
+
+    def get_segment(self, nr_of_segments, angle=None, bounds=None):
+        '''Returns the segment under the stopper
+
+        :param nr_of_segments: The number of segments
+        :param angle: The wheel angle, defaults to the current angle
+        :param bounds: The end angles of the segments, defaults to equally sized segments
+        :return: The segment index
+        '''
+        angle = self.get_angle() if angle is None else angle
+        if bounds:
+            return min(bisect.bisect_right(bounds, (self.POINTER_ANGLE + angle) % 360), nr_of_segments - 1)
+        return int(((self.POINTER_ANGLE + angle) % 360) / (360 / nr_of_segments)) % nr_of_segments
+
+    def is_spinning(self):
+        '''Returns whether the wheel is spinning
+
+        :return: True if the wheel is spinning, False else
+        '''
+        return self.spinning_direction != SpinningDirection.NONE
+
+    def is_spinning_right(self):
+        '''Returns whether the wheel is spinning in the right direction
+
+        :return: True if the wheel is spinning in the right direction, False else
+        '''
+        return self.spinning_direction == SpinningDirection.RIGHT
+
+    def is_spinning_left(self):
+        '''Returns whether the wheel is spinning in the left direction
+
+        :return: True if the wheel is spinning in the left direction, False else
+        '''
+        return self.spinning_direction == SpinningDirection.LEFT
+
+    def get_nr_of_rounds_not_spinning(self):
+        '''Returns how many rounds the wheel is not spinning
+
+        :return: How many rounds the wheel is not spinning, if was spinning
+        '''
+        resting_rounds = 0
+        for d in reversed(self.spinning_direction_last):
+            if d == SpinningDirection.NONE:
+                resting_rounds = resting_rounds + 1
+            else:
+                return resting_rounds, True
+
+        return resting_rounds, False
+
+    def reseed(self):
+        '''Starts the random sequence of a new spin, its seed is drawn from the current sequence
+
+        :return: The seed of the spin, WheelPhysics(seed=...) continues with the same braking from the same angle and speed
+        '''
+        seed = self.rng.getrandbits(64)
+        self.rng.seed(seed)
+        return seed
+
+    def reset_spinning_direction_last(self):
+        '''Forgets the past spinning directions'''
+        self.spinning_direction_last = []
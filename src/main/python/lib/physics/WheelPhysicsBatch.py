@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019-2023 Denis Meyer
+#
+# This file is part of the Wheel of Fun app.
+#
+
+'''Wheel of Fun - WheelPhysicsBatch'''
+
+import logging
+
+import numpy as np
+
+from lib.physics.WheelPhysics import WheelPhysics
+
+
+class WheelPhysicsBatch:
+    '''Vectorized wheel physics, advances many independent released spins per step
+
+    Follows WheelPhysics step by step, but draws the stopper braking from a NumPy generator.
+    '''
+
+    DIRECTION_LEFT = -1
+    DIRECTION_NONE = 0
+    DIRECTION_RIGHT = 1
+
+    def __init__(self, angle_increases, angles=None, seed=None):
+        '''Initializes
+
+        :param angle_increases: The initial angle increases (velocities) of the spins
+        :param angles: The initial angles of the spins, defaults to 0
+        :param seed: The seed for the random stopper braking
+        '''
+        logging.debug('Initializing WheelPhysicsBatch')
+
+        self.rng = np.random.default_rng(seed)
+
+        self.angle_increase = np.array(angle_increases, dtype=np.float64)
+        self.nr_of_spins = self.angle_increase.shape[0]
+        if angles is None:
+            self.angle = np.zeros(self.nr_of_spins)
+        else:
+            self.angle = np.array(angles, dtype=np.float64) % 360
+        self.angle_mod_45 = self.angle % WheelPhysics.STOPPER_ANGLE
+        self.spinning_direction = np.zeros(self.nr_of_spins, dtype=np.int8)
+
+        self.active = np.ones(self.nr_of_spins, dtype=bool)
+        self.steps = np.zeros(self.nr_of_spins, dtype=np.int64)
+
+        thresholds, factors = zip(*WheelPhysics.ANGLE_DECREASE_FACTORS)
+        self._factor_thresholds = np.array(thresholds)
+        self._factors = np.array(factors + (1.0,))
+
+    def _is_45_deg(self):
+        '''Returns whether the wheels are on 45 degrees
+
+        :return: Boolean array
+        '''
+        right = self.spinning_direction == self.DIRECTION_RIGHT
+        left = self.spinning_direction == self.DIRECTION_LEFT
+        factor = np.where(right, 1.0, -1.0)
+        incdec = 3 + factor * self.angle_increase
+        on_right = (self.angle_mod_45 > incdec) & (self.angle_mod_45 - self.angle_increase < incdec)
+        on_left = (self.angle_mod_45 < 45 - incdec) & (self.angle_mod_45 + factor * self.angle_increase > 45 - incdec)
+        return (right & on_right) | (left & on_left)
+
+    def step(self):
+        '''Advances all spins by one step without input'''
+        increase = WheelPhysics.INCREASE_ON_DRAG
+        self.spinning_direction = np.where(np.abs(self.angle_increase) <= increase, self.DIRECTION_NONE,
+                                           np.sign(self.angle_increase)).astype(np.int8)
+        right = self.spinning_direction == self.DIRECTION_RIGHT
+        left = self.spinning_direction == self.DIRECTION_LEFT
+        none = self.spinning_direction == self.DIRECTION_NONE
+
+        factor = self._factors[np.searchsorted(self._factor_thresholds, np.abs(self.angle_increase), side='left')]
+        factor[none] = 1.0
+        value = WheelPhysics.DECREASE_ON_DRAG_STOP * factor
+        self.angle_increase += np.where(right, -value, value)
+
+        braking = self.rng.uniform(WheelPhysics.DECREASE_ON_STOPPER_MIN, WheelPhysics.DECREASE_ON_STOPPER_MAX, self.nr_of_spins)
+        self.angle_increase -= np.where(self._is_45_deg(), np.where(right, braking, -braking), 0.0)
+
+        threshold = WheelPhysics.THRESHOLD_NOT_SPINNING
+        stopped = none | (right & (self.angle_increase <= threshold)) | (left & (self.angle_increase >= -threshold))
+        self.angle_increase[stopped] = 0
+        np.clip(self.angle_increase, -WheelPhysics.MAX_ANGLE_INCREASE, WheelPhysics.MAX_ANGLE_INCREASE, out=self.angle_increase)
+
+        self.angle_mod_45 = self.angle % WheelPhysics.STOPPER_ANGLE
+        self.angle = (self.angle - self.angle_increase) % 360
+
+        self.steps += self.active
+        self.active &= self.angle_increase != 0
+
+    def run_to_rest(self, max_steps=1000000):
+        '''Advances all spins until every wheel has come to rest
+
+        :param max_steps: The maximum number of steps
+        :return: The number of steps each spin took
+        '''
+        step = 0
+        while step < max_steps and self.active.any():
+            self.step()
+            step += 1
+
+        return self.steps
+
+    def get_segments(self, nr_of_segments, bounds=None):
+        '''Returns the segments under the stopper
+
+        :param nr_of_segments: The number of segments
+        :param bounds: The end angles of the segments, defaults to equally sized segments
+        :return: Array of segment indices
+        '''
+        angle = (WheelPhysics.POINTER_ANGLE + self.angle) % 360
+        if bounds:
+            return np.minimum(np.searchsorted(bounds, angle, side='right'), nr_of_segments - 1)
+        return (angle / (360 / nr_of_segments)).astype(np.int64) % nr_of_segments
+
+    def get_segment_distribution(self, nr_of_segments, bounds=None):
+        '''Returns how often each segment was hit
+
+        :param nr_of_segments: The number of segments
+        :param bounds: The end angles of the segments, defaults to equally sized segments
+        :return: Array of counts per segment
+        '''
+        return np.bincount(self.get_segments(nr_of_segments, bounds), minlength=nr_of_segments)
+
+    def get_duration_statistics(self, fps):
+        '''Returns statistics about the spin durations
+
+        :param fps: The physics steps per second
+        :return: Dictionary of statistics in seconds
+        '''
+        durations = self.steps / fps
+        return {
+            'mean': float(np.mean(durations)),
+            'std': float(np.std(durations)),
+            'min': float(np.min(durations)),
+            'p50': float(np.percentile(durations, 50)),
+            'p90': float(np.percentile(durations, 90)),
+            'p99': float(np.percentile(durations, 99)),
+            'max': float(np.max(durations))
+        }